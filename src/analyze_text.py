@@ -1,20 +1,113 @@
 # src/analyze_text.py
 
 import os
-import json
+import re
+import sys
+import argparse
+import asyncio
+import functools
+import multiprocessing
+from dataclasses import dataclass
+from pathlib import Path
+import ijson
+import numpy as np
+import orjson
 import pandas as pd
-from textblob import TextBlob
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as paj
+from textblob.en import sentiment as PATTERN_LEXICON # TextBlob's own word lexicon (loaded lazily)
+from textblob.en.sentiments import PatternAnalyzer
 from dotenv import load_dotenv
 
-# --- Load Environment Variables (Optional for this script, but good practice) ---
-load_dotenv('../.env')
+try:
+    from numba import njit, prange
+except ImportError: # Numba is optional; the NumPy gather/reduce path is used without it
+    njit = None
 
 # --- Configuration ---
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Project root
-DATA_DIR = os.path.join(BASE_DIR, "data")
-COMMENTS_DIR = os.path.join(DATA_DIR, 'comments')
+BASE_DIR = Path(__file__).resolve().parent.parent # Project root
+DATA_DIR = BASE_DIR / "data"
+COMMENTS_DIR = DATA_DIR / "comments"
+TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
+SENTIMENT_DIR = DATA_DIR / "sentiment" # Parquet output of this script
 
-# --- Helper Function ---
+# --- Lexicon Scoring Configuration ---
+TEXT_SEPARATOR = "\x00" # Joins a batch into one string; matched as its own token to mark text boundaries
+TOKEN_PATTERN = re.compile(r"[a-z']+|\x00") # Applied to the lower-cased, joined batch
+VADER_ALPHA = 15.0 # VADER's normalization constant, maps summed weights into (-1, +1)
+SCORE_DTYPE = np.float16 # Scores live in [-1, 1] and only need ~0.001 resolution; half the bytes of float32
+PARALLEL_MIN_TEXTS = 1000 # TextBlob fallback only fans out to worker processes above this many texts
+POOL_CHUNKSIZE = 256 # Texts per task, large enough that IPC doesn't dominate
+
+SHORT_TEXT_PATTERN = re.compile(r"^[\s.,!?]*(?:\w+[\s.,!?]*){1,3}$") # 1-3 words, plain punctuation only
+WORD_PATTERN = re.compile(r"\w+")
+
+# --- Comment Loading Configuration ---
+STREAMING_MIN_BYTES = 50 * 1024 * 1024 # Comment files above this size are streamed with ijson
+
+def _load_lexicon():
+    """
+    Loads the VADER lexicon into two arrays sorted by word hash, so a whole batch
+    of tokens can be looked up with a single np.searchsorted call.
+    Returns (hashes, weights) or (None, None) if the lexicon is not installed.
+    """
+    try:
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        lexicon = SentimentIntensityAnalyzer().lexicon
+    except LookupError:
+        print("Warning: VADER lexicon not found (run nltk.download('vader_lexicon')). Falling back to TextBlob.")
+        return None, None
+    hashes = np.fromiter((hash(word) for word in lexicon), dtype=np.int64, count=len(lexicon))
+    weights = np.fromiter(lexicon.values(), dtype=np.float32, count=len(lexicon))
+    order = np.argsort(hashes)
+    return hashes[order], weights[order]
+
+# Built once at import; hash() is stable within a process, which is all the lookup needs
+LEXICON_HASHES, LEXICON_WEIGHTS = _load_lexicon()
+
+# Shared TextBlob analyzer: calling it directly skips building a TextBlob wrapper per text,
+# and one warm-up call loads its lexicon now rather than inside the first scoring loop
+TEXTBLOB_ANALYZER = PatternAnalyzer()
+TEXTBLOB_ANALYZER.analyze("warmup")
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, parallel=True) # cache=True keeps the compiled kernel on disk between runs
+    def score_segments(token_hashes, text_offsets, vocab, weights, alpha):
+        """
+        Scores every text in a single pass: binary-searches each token hash in the sorted
+        vocab and accumulates polarity/subjectivity, with no temporary arrays.
+        Texts are independent, so the outer loop is split across threads.
+        Tokens of text i are token_hashes[text_offsets[i]:text_offsets[i + 1]].
+        """
+        n_texts = len(text_offsets) - 1
+        n_vocab = len(vocab)
+        polarity = np.zeros(n_texts, dtype=np.float32)
+        subjectivity = np.zeros(n_texts, dtype=np.float32)
+        for i in prange(n_texts):
+            start, end = text_offsets[i], text_offsets[i + 1]
+            raw_score = 0.0
+            hit_count = 0
+            for t in range(start, end):
+                token = token_hashes[t]
+                lo, hi = 0, n_vocab
+                while lo < hi:
+                    mid = (lo + hi) >> 1
+                    if vocab[mid] < token:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                if lo < n_vocab and vocab[lo] == token:
+                    raw_score += weights[lo]
+                    hit_count += 1
+            if end > start:
+                polarity[i] = raw_score / np.sqrt(raw_score * raw_score + alpha)
+                subjectivity[i] = hit_count / (end - start)
+        return polarity, subjectivity
+else:
+    score_segments = None
+
+# --- Helper Functions ---
 
 def analyze_sentiment(text):
     """
@@ -24,211 +117,293 @@ def analyze_sentiment(text):
     if not isinstance(text, str) or not text.strip():
         # Return neutral sentiment for empty or non-string input
         return 0.0, 0.0
+    if SHORT_TEXT_PATTERN.match(text) and not any(word in PATTERN_LEXICON for word in WORD_PATTERN.findall(text.lower())):
+        # Short text ("No!", "Me.", "Oh, yeah.") with no lexicon word: TextBlob would score it neutral anyway
+        return 0.0, 0.0
+    return _analyze_sentiment_cached(text.strip())
+
+@functools.lru_cache(maxsize=100_000)
+def _analyze_sentiment_cached(text):
+    """TextBlob scoring memoized on the stripped text; repeated segments/comments are scored once."""
     try:
-        analysis = TextBlob(text)
-        return analysis.sentiment.polarity, analysis.sentiment.subjectivity
+        sentiment = TEXTBLOB_ANALYZER.analyze(text)
+        return sentiment.polarity, sentiment.subjectivity
     except Exception as e:
         print(f"Error analyzing sentiment for text: '{text[:50]}...' - {e}")
         return 0.0, 0.0 # Return neutral on error
 
+def analyze_sentiment_batch(texts):
+    """
+    Analyzes the sentiment of a list of texts in one vectorized pass over the VADER lexicon.
+    Returns two SCORE_DTYPE (float16) arrays aligned with texts: polarity (-1.0 to +1.0)
+    and subjectivity (0.0 to 1.0, the share of tokens that carry sentiment).
+    Duplicate texts are scored only once.
+    """
+    cleaned_texts = [text.strip() if isinstance(text, str) else '' for text in texts]
+    unique_texts, inverse = np.unique(np.array(cleaned_texts, dtype=object), return_inverse=True)
+    polarity, subjectivity = _score_texts(unique_texts)
+    # Scoring accumulates in float32; only the stored results are quantized
+    return polarity.astype(SCORE_DTYPE)[inverse], subjectivity.astype(SCORE_DTYPE)[inverse]
+
+def _score_texts(texts):
+    """
+    Scores texts with the Numba kernel when available, otherwise NumPy; falls back to
+    per-text TextBlob scoring if the lexicon is unavailable.
+    """
+    if LEXICON_HASHES is None:
+        if len(texts) >= PARALLEL_MIN_TEXTS:
+            # Workers get the analyzer warmed at import, whether forked or spawned
+            with multiprocessing.Pool(os.cpu_count()) as pool:
+                scores = pool.map(analyze_sentiment, texts, chunksize=POOL_CHUNKSIZE) # map keeps input order
+        else:
+            scores = [analyze_sentiment(text) for text in texts]
+        polarity, subjectivity = zip(*scores) if scores else ((), ())
+        return np.array(polarity, dtype=np.float32), np.array(subjectivity, dtype=np.float32)
+
+    n_texts = len(texts)
+    if n_texts == 0:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+    # Lower-case and tokenize the whole batch with one C-level call each instead of per text.
+    # Every text is followed by a separator token, so the separators' positions give token counts.
+    # NULs inside a text (valid JSON "\u0000") would read as extra boundaries, so they become spaces.
+    corpus = (TEXT_SEPARATOR.join(text.replace(TEXT_SEPARATOR, " ") for text in texts) + TEXT_SEPARATOR).lower()
+    tokens = TOKEN_PATTERN.findall(corpus)
+    all_hashes = np.fromiter(map(hash, tokens), dtype=np.int64, count=len(tokens))
+    is_separator = all_hashes == hash(TEXT_SEPARATOR)
+    token_counts = np.diff(np.flatnonzero(is_separator), prepend=-1) - 1
+    token_hashes = all_hashes[~is_separator]
+
+    if score_segments is not None:
+        text_offsets = np.zeros(n_texts + 1, dtype=np.int64)
+        np.cumsum(token_counts, out=text_offsets[1:])
+        return score_segments(token_hashes, text_offsets, LEXICON_HASHES, LEXICON_WEIGHTS, VADER_ALPHA)
+
+    text_index = np.repeat(np.arange(n_texts), token_counts) # Owning text of every token
+
+    # Gather lexicon weights for all tokens at once; misses contribute zero
+    positions = np.minimum(np.searchsorted(LEXICON_HASHES, token_hashes), len(LEXICON_HASHES) - 1)
+    hits = LEXICON_HASHES[positions] == token_hashes
+    token_weights = np.where(hits, LEXICON_WEIGHTS[positions], 0.0)
+
+    # Sum per text (bincount also handles texts with no tokens, unlike reduceat)
+    raw_scores = np.bincount(text_index, weights=token_weights, minlength=n_texts)
+    hit_counts = np.bincount(text_index, weights=hits, minlength=n_texts)
+    polarity = raw_scores / np.sqrt(raw_scores * raw_scores + VADER_ALPHA)
+    subjectivity = np.divide(hit_counts, token_counts, out=np.zeros(n_texts), where=token_counts > 0)
+    return polarity.astype(np.float32), subjectivity.astype(np.float32)
+
+@dataclass(slots=True)
+class Segment:
+    """A transcript segment; start/end are in seconds."""
+    start: float
+    end: float
+    text: str
+
+def load_transcript_segments(transcript_path):
+    """
+    Loads transcript segments ('start', 'end', 'text' dicts) from a JSON file as Segment objects.
+    Returns None if the file cannot be read.
+    """
+    try:
+        with open(transcript_path, 'rb') as f:
+            segments = orjson.loads(f.read())
+        if not isinstance(segments, list):
+            print(f"Warning: Expected a list of segments in {transcript_path}. Returning no segments.")
+            return []
+        # Defaults are applied once here, so callers use plain attribute access
+        return [Segment(segment.get('start'), segment.get('end'), segment.get('text') or '')
+                for segment in segments if isinstance(segment, dict)]
+    except FileNotFoundError:
+        print(f"Error: Transcript file not found at {transcript_path}")
+        return None
+    except orjson.JSONDecodeError:
+        print(f"Error: Could not decode JSON from {transcript_path}")
+        return None
+
 def load_comments_from_json(video_id, comments_dir):
-    """Loads comments from the JSON file for a given video ID."""
-    comments_path = os.path.join(comments_dir, f"{video_id}_comments.json")
+    """
+    Loads comments from the JSON file for a given video ID, preferring a newline-delimited
+    {video_id}_comments.jsonl next to it if one exists.
+    Returns a list of (comment_id, text) tuples, or None if the file cannot be read.
+    """
+    comments_path = Path(comments_dir) / f"{video_id}_comments.json"
     try:
-        with open(comments_path, 'r', encoding='utf-8') as f:
-            comments_data = json.load(f)
-        # Convert to DataFrame for easier handling, ensure 'text' column exists
-        df = pd.DataFrame(comments_data)
-        if 'text' not in df.columns:
-             print(f"Warning: 'text' column not found in {comments_path}. Returning empty DataFrame.")
-             return pd.DataFrame(columns=['comment_id', 'text']) # Return empty with expected columns
-        # Select only relevant columns, handle potential missing comment_id
-        if 'comment_id' not in df.columns:
-            df['comment_id'] = [f"comment_{i}" for i in range(len(df))] # Generate placeholder IDs
-        return df[['comment_id', 'text']]
+        ndjson_path = comments_path.with_suffix('.jsonl')
+        if ndjson_path.exists():
+            comments_path = ndjson_path # Keeps the error messages below pointing at the file read
+            return load_comments_from_ndjson(ndjson_path)
+        if os.path.getsize(comments_path) > STREAMING_MIN_BYTES:
+            # Large file: never materialize the full comment objects, only the fields we score
+            return list(iter_comments_from_json(comments_path))
+        with open(comments_path, 'rb') as f:
+            comments_data = orjson.loads(f.read())
+        if not isinstance(comments_data, list):
+            print(f"Warning: Expected a list of comments in {comments_path}. Returning no comments.")
+            return []
+        # Keep only the fields we score, generating placeholder IDs where comment_id is missing
+        return [(comment.get('comment_id') or f"comment_{i}", comment.get('text') or '')
+                for i, comment in enumerate(comments_data) if isinstance(comment, dict)]
 
     except FileNotFoundError:
         print(f"Error: Comments file not found at {comments_path}")
         return None
-    except json.JSONDecodeError:
+    except (orjson.JSONDecodeError, ijson.JSONError, pa.ArrowInvalid):
         print(f"Error: Could not decode JSON from {comments_path}")
         return None
     except Exception as e:
         print(f"An unexpected error occurred loading comments for {video_id}: {e}")
         return None
 
-# --- Main Execution ---
-if __name__ == "__main__":
-    print("--- Text Sentiment Analysis Script ---")
+def load_comments_from_ndjson(comments_path):
+    """
+    Reads a newline-delimited comments file straight into an Arrow table with pyarrow's
+    multithreaded JSON reader, so no per-comment dict is ever built.
+    Returns a list of (comment_id, text) tuples.
+    """
+    table = paj.read_json(comments_path)
+    if 'text' not in table.column_names:
+        print(f"Warning: 'text' field not found in {comments_path}. Returning no comments.")
+        return []
+    texts = pc.fill_null(table.column('text'), '').to_pylist()
+    if 'comment_id' in table.column_names:
+        comment_ids = [comment_id or f"comment_{i}" for i, comment_id in enumerate(table.column('comment_id').to_pylist())]
+    else:
+        comment_ids = [f"comment_{i}" for i in range(len(texts))] # Generate placeholder IDs
+    return list(zip(comment_ids, texts))
 
-    # --- Select Video to Process ---
-    # Use the SAME video ID for which you have the transcript segments below
-    TEST_VIDEO_ID = "bcGxg3c1HE8" # <<< MAKE SURE THIS MATCHES THE TRANSCRIPT BELOW
-
-    # --- Placeholder for Transcript Segments ---
-    # Copy and paste the 'segments' list output from running process_audio.py
-    # for the TEST_VIDEO_ID above.
-    # Example structure: [{'start': 0.0, 'end': 1.92, 'text': ' Segment text...'}, ...]
-    placeholder_transcript_segments = [
-        {'start': 0.0, 'end': 1.92, 'text': ' 2024 is the year of elections,'},
-        {'start': 1.92, 'end': 4.2, 'text': ' but at least 50 countries around the world'},
-        {'start': 4.2, 'end': 5.12, 'text': ' earned the polls.'},
-        {'start': 5.12, 'end': 8.28, 'text': " 2024 is a year of what is, but democracies."},
-        {'start': 8.28, 'end': 11.0, 'text': " This year's results ended in a strong showing"},
-        {'start': 11.0, 'end': 14.76, 'text': ' for the far right across much of the European Union.'},
-        {'start': 14.76, 'end': 17.32, 'text': ' Democracy has been surprisingly resilient.'},
-        {'start': 17.32, 'end': 22.04, 'text': ' The 2024 presidential campaign went from deja vu to utter chaos.'},
-        {'start': 22.04, 'end': 23.12, 'text': ' Look what happened.'}, {'start': 23.12, 'end': 24.04, 'text': ' This is crazy.'},
-        {'start': 30.0, 'end': 44.96, 'text': ' At a time when the world is so turbulent,'},
-        {'start': 44.96, 'end': 47.2, 'text': ' the Olympics allows people around the globe'},
-        {'start': 47.2, 'end': 49.08, 'text': ' to share some common experiences.'},
-        {'start': 49.08, 'end': 51.76, 'text': " But it's athletes creating memorable moments"},
-        {'start': 51.76, 'end': 53.84, 'text': ' that really got people talking this time.'},
-        {'start': 53.84, 'end': 55.72, 'text': " I'm not sure what to do."},
-        {'start': 55.72, 'end': 58.52, 'text': " I'm not sure what to do."},
-        {'start': 58.52, 'end': 60.68, 'text': " I'm not sure what to do."},
-        {'start': 60.68, 'end': 62.16, 'text': " I'm not sure what to do."},
-        {'start': 62.16, 'end': 64.36, 'text': " I'm not sure what to do."},
-        {'start': 64.36, 'end': 67.72, 'text': ' Rafael Nadal has announced his retirement from professional tennis.'},
-        {'start': 67.72, 'end': 70.52, 'text': " Interesting women's sports has never been higher."},
-        {'start': 70.52, 'end': 72.52, 'text': " I didn't know that that was happening."},
-        {'start': 72.52, 'end': 74.88, 'text': " I've seen it, yeah."},
-        {'start': 74.88, 'end': 77.36, 'text': " This summer's music scene has been dominated"},
-        {'start': 77.36, 'end': 80.48, 'text': ' by a wave of young women singers described a crime.'},
-        {'start': 80.48, 'end': 81.12, 'text': ' Me.'},
-        {'start': 81.12, 'end': 82.16, 'text': ' Very junior.'},
-        {'start': 82.16, 'end': 83.2, 'text': ' Very bright folk.'},
-        {'start': 83.2, 'end': 86.04, 'text': ' Beyonce is making history the first black woman'},
-        {'start': 86.04, 'end': 89.88, 'text': ' to top the Billboard country charts.'},
-        {'start': 89.88, 'end': 93.32, 'text': ' Bitcoin just hit $100,000.'},
-        {'start': 93.32, 'end': 94.88, 'text': ' Andflation is still too high.'},
-        {'start': 94.88, 'end': 96.92, 'text': " I'm looking for a man in finance."},
-        {'start': 96.92, 'end': 97.56, 'text': ' Tristan.'},
-        {'start': 97.56, 'end': 100.16, 'text': ' A multi-state manhunt suspect involved'},
-        {'start': 100.16, 'end': 102.28, 'text': ' in the murder of United Health Care CEO.'},
-        {'start': 102.28, 'end': 104.44, 'text': ' hottest cold-blooded killer in America.'},
-        {'start': 104.44, 'end': 108.24, 'text': ' Another drone type object traversing this airspace.'},
-        {'start': 108.24, 'end': 110.36, 'text': ' A Microsoft outage is causing problems'},
-        {'start': 110.36, 'end': 112.84, 'text': ' for airlines, banks, government agencies,'},
-        {'start': 112.88, 'end': 114.16, 'text': ' and companies around the world.'},
-        {'start': 114.16, 'end': 118.28, 'text': ' Two Boeing astronauts stranded on the international space station.'},
-        {'start': 118.28, 'end': 120.48, 'text': " That's just the way it goes sometimes."},
-        {'start': 120.48, 'end': 122.36, 'text': " 1.24 is we're not fine this year."},
-        {'start': 122.36, 'end': 125.6, 'text': " You know, we're postponed to a 25."},
-        {'start': 125.6, 'end': 128.0, 'text': ' It is virtually certain 2024.'},
-        {'start': 128.0, 'end': 130.56, 'text': " Could be the planet's hottest year on record."},
-        {'start': 130.56, 'end': 132.16, 'text': " We can see that we're not ready"},
-        {'start': 132.16, 'end': 134.36, 'text': " for the storms that we're ever saving now."},
-        {'start': 134.36, 'end': 136.2, 'text': " And it's going to be worse in the future."},
-        {'start': 136.2, 'end': 143.56, 'text': ' Those in the industry call it a permacrisis,'},
-        {'start': 143.56, 'end': 146.92, 'text': ' a sense that the world is latching from warning stream events.'},
-        {'start': 146.92, 'end': 147.72, 'text': ' To another.'},
-        {'start': 147.72, 'end': 151.36, 'text': " Russia's war in Ukraine enters its third years of thousands"},
-        {'start': 151.36, 'end': 153.42, 'text': ' at the displaced across the Haitian Cam'},
-        {'start': 153.42, 'end': 155.64, 'text': ' and authoritarian crisis in Sudan is worsening.'},
-        {'start': 155.64, 'end': 158.44, 'text': " South Korea's parliament voting to impeach President"},
-        {'start': 158.44, 'end': 162.16, 'text': ' Yunsuki over his short-lived declaration of martial law.'},
-        {'start': 162.16, 'end': 164.92, 'text': ' Israel has expanded its bombardment of Lebanon'},
-        {'start': 164.92, 'end': 166.16, 'text': ' striking new areas.'},
-        {'start': 166.16, 'end': 169.88, 'text': ' The alleged that Netanyahu Gallant used starvation'},
-        {'start': 169.88, 'end': 171.48, 'text': ' as a tool of war.'},
-        {'start': 171.48, 'end': 172.48, 'text': ' Yeah.'},
-        {'start': 172.48, 'end': 173.48, 'text': ' Oh, yeah.'},
-        {'start': 176.0, 'end': 179.44, 'text': ' We did not get justice once again.'},
-        {'start': 179.44, 'end': 181.76, 'text': " I don't like that this is a fact of life."},
-        {'start': 181.76, 'end': 182.48, 'text': ' Screw you.'},
-        {'start': 182.48, 'end': 184.36, 'text': ' If you think this is a fact of life,'},
-        {'start': 184.36, 'end': 185.8, 'text': ' then I should just get over.'},
-        {'start': 189.16, 'end': 192.36, 'text': ' The mental state in the Middle East.'},
-        {'start': 192.36, 'end': 196.96, 'text': ' Decades of savage horrific rule over in a matter of days.'},
-        {'start': 196.96, 'end': 198.56, 'text': ' We have so much hope.'},
-        {'start': 198.56, 'end': 201.8, 'text': ' We hope Blackboard with their and with their future for Syria.'},
-        {'start': 201.8, 'end': 204.04, 'text': ' History has been made in Mexico.'},
-        {'start': 204.04, 'end': 206.88, 'text': " Claudia Shambal has been elected as the country's first"},
-        {'start': 206.88, 'end': 209.4, 'text': ' in a female press.'},
-        {'start': 209.4, 'end': 211.44, 'text': ' Cameroon has become the first country'},
-        {'start': 211.44, 'end': 213.96, 'text': ' to roll out a new malaria vaccine.'},
-        {'start': 213.96, 'end': 217.2, 'text': ' France has become the only country to guarantee abortion'},
-        {'start': 217.2, 'end': 220.48, 'text': ' as a constitutional right.'},
-        {'start': 220.48, 'end': 225.64, 'text': " For so long, I've always wanted to be different."},
-        {'start': 225.64, 'end': 231.0, 'text': ' And now I realize I just need to pee myself.'},
-        {'start': 231.0, 'end': 234.04, 'text': " We don't want to bring children into a world"},
-        {'start': 234.04, 'end': 238.12, 'text': " where from the very beginning they believe everything's hopeless."},
-        {'start': 238.12, 'end': 242.12, 'text': ' When if we get together, if we roll up our sleeves'},
-        {'start': 242.12, 'end': 247.4, 'text': ' and take action, each of us doing what we feel is important,'},
-        {'start': 247.4, 'end': 251.24, 'text': ' then there is hope for the future.'},
-        {'start': 251.24, 'end': 252.2, 'text': ' No!'},
-        {'start': 252.2, 'end': 253.2, 'text': ' No!'},
-        {'start': 259.2, 'end': 263.04, 'text': " It's important to remember that we are not allowed a fear, is?"},
-        {'start': 263.04, 'end': 264.04, 'text': " And that's OK."},
-        {'start': 269.44, 'end': 270.36, 'text': ' Thanks for watching.'},
-        {'start': 270.36, 'end': 273.36, 'text': ' This was our 11th end of year wrap-up video.'},
-        {'start': 273.36, 'end': 276.36, 'text': ' It was only possible because of you, our viewers.'},
-        {'start': 276.36, 'end': 278.32, 'text': ' But especially our members.'},
-        {'start': 278.32, 'end': 279.2, 'text': ' Do you like what we do?'},
-        {'start': 279.2, 'end': 281.04, 'text': " And you'd like to support that work?"},
-        {'start': 281.04, 'end': 283.48, 'text': ' Go to Vox.com slash memberships.'},
-        {'start': 283.48, 'end': 284.28, 'text': ' Thank you.'},
-        {'start': 284.28, 'end': 287.44, 'text': ' And happy new year from the Vox video team.'}
-    ] # End of placeholder_transcript_segments list
+def iter_comments_from_json(comments_path):
+    """
+    Streams (comment_id, text) tuples from a comments JSON array one comment at a time,
+    keeping memory flat regardless of file size.
+    """
+    with open(comments_path, 'rb') as f:
+        for i, comment in enumerate(ijson.items(f, 'item')):
+            if isinstance(comment, dict):
+                yield comment.get('comment_id') or f"comment_{i}", comment.get('text') or ''
+
+def save_sentiment_table(table, output_path):
+    """Writes a sentiment results DataFrame to a zstd-compressed Parquet file."""
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        table.to_parquet(output_path, compression='zstd', index=False)
+        print(f"Saved {len(table)} rows to {output_path}")
+        return True
+    except Exception as e:
+        print(f"Error saving sentiment results to {output_path}: {e}")
+        return False
+
+def load_comments_for_videos(video_ids, comments_dir):
+    """
+    Loads the comment files of several videos concurrently. File reads and parsing run in
+    worker threads, so total load time approaches the slowest file rather than the sum.
+    Returns {video_id: load_comments_from_json result}.
+    """
+    async def _load_all():
+        results = await asyncio.gather(*(asyncio.to_thread(load_comments_from_json, video_id, comments_dir)
+                                         for video_id in video_ids))
+        return dict(zip(video_ids, results))
+    return asyncio.run(_load_all())
+
+def analyze_video(video_id, transcript_segments, comments_list, verbose=True):
+    """
+    Scores one video's transcript segments and comments, prints the results and saves them
+    as Parquet tables under SENTIMENT_DIR. comments_list is load_comments_from_json's result.
+    """
+    # --- Score Transcript and Comments Together ---
+    # One batch over both sources amortizes tokenizing/dedup/kernel setup and
+    # lets a comment that repeats a transcript line reuse its score
+    segment_texts = [segment.text for segment in transcript_segments]
+    comment_texts = [text for _, text in comments_list] if comments_list else []
+    all_polarities, all_subjectivities = analyze_sentiment_batch(segment_texts + comment_texts)
+    n_segments = len(segment_texts)
+    segment_polarities, comment_polarities = all_polarities[:n_segments], all_polarities[n_segments:]
+    segment_subjectivities, comment_subjectivities = all_subjectivities[:n_segments], all_subjectivities[n_segments:]
 
     # --- Analyze Transcript ---
-    print(f"\n--- Analyzing Transcript Segments for Video: {TEST_VIDEO_ID} ---")
+    print(f"\n--- Analyzing Transcript Segments for Video: {video_id} ---")
     print("Polarity: -1 (Negative) to +1 (Positive)")
     print("Subjectivity: 0 (Objective) to 1 (Subjective)")
     print("-" * 60)
-    transcript_sentiments = []
-    for i, segment in enumerate(placeholder_transcript_segments):
-        text = segment.get('text', '') # Get text, default to empty string if missing
-        polarity, subjectivity = analyze_sentiment(text)
-        transcript_sentiments.append({
-            'video_id': TEST_VIDEO_ID,
-            'segment_index': i,
-            'start_time': segment.get('start'),
-            'end_time': segment.get('end'),
-            'text': text.strip(), # Remove leading/trailing whitespace
-            'polarity': polarity,
-            'subjectivity': subjectivity
-        })
-        # Print results neatly
-        print(f"[{segment.get('start'):>6.2f}s -> {segment.get('end'):>6.2f}s] Pol: {polarity:>+6.3f}, Subj: {subjectivity:.3f} | Text: {text.strip()[:80]}...")
+    # Results are kept column-wise (one array per field) rather than as a dict per row
+    transcript_sentiments = pd.DataFrame({
+        'video_id': pd.Categorical([video_id] * n_segments), # Constant column, stored once
+        'segment_index': np.arange(n_segments, dtype=np.int32),
+        'start_time': np.array([segment.start for segment in transcript_segments], dtype=np.float32),
+        'end_time': np.array([segment.end for segment in transcript_segments], dtype=np.float32),
+        'text': [text.strip() for text in segment_texts], # Remove leading/trailing whitespace
+        'polarity': segment_polarities,
+        'subjectivity': segment_subjectivities
+    })
+    if verbose:
+        # .tolist() converts each column to Python objects in one C call, instead of
+        # indexing and boxing a NumPy scalar per row
+        segment_rows = zip(*(transcript_sentiments[column].tolist() for column in ('start_time', 'end_time', 'polarity', 'subjectivity', 'text')))
+        sys.stdout.writelines(f"[{start:>6.2f}s -> {end:>6.2f}s] Pol: {polarity:>+6.3f}, Subj: {subjectivity:.3f} | Text: {text[:80]}...\n"
+                              for start, end, polarity, subjectivity, text in segment_rows)
 
     # --- Analyze Comments ---
-    print(f"\n--- Analyzing Comments for Video: {TEST_VIDEO_ID} ---")
-    comments_df = load_comments_from_json(TEST_VIDEO_ID, COMMENTS_DIR)
-    comment_sentiments = []
-    if comments_df is not None and not comments_df.empty:
-        print(f"Loaded {len(comments_df)} comments.")
+    print(f"\n--- Analyzing Comments for Video: {video_id} ---")
+    comment_sentiments = None
+    if comments_list:
+        print(f"Loaded {len(comments_list)} comments.")
         print("-" * 60)
-        # Use .itertuples() for slightly better performance than iterrows
-        for row in comments_df.itertuples(index=False):
-            comment_id = row.comment_id
-            text = row.text
-            polarity, subjectivity = analyze_sentiment(text)
-            comment_sentiments.append({
-                'video_id': TEST_VIDEO_ID,
-                'comment_id': comment_id,
-                'text': text,
-                'polarity': polarity,
-                'subjectivity': subjectivity
-            })
-            # Print results neatly
-            print(f"Comment ID: {comment_id[:15]}... | Pol: {polarity:>+6.3f}, Subj: {subjectivity:.3f} | Text: {text[:80]}...")
-    elif comments_df is not None and comments_df.empty:
-         print("Comment DataFrame loaded but is empty.")
+        comment_sentiments = pd.DataFrame({
+            'video_id': pd.Categorical([video_id] * len(comments_list)),
+            'comment_id': [comment_id for comment_id, _ in comments_list],
+            'text': comment_texts,
+            'polarity': comment_polarities,
+            'subjectivity': comment_subjectivities
+        })
+        if verbose:
+            comment_rows = zip(*(comment_sentiments[column].tolist() for column in ('comment_id', 'polarity', 'subjectivity', 'text')))
+            sys.stdout.writelines(f"Comment ID: {comment_id[:15]}... | Pol: {polarity:>+6.3f}, Subj: {subjectivity:.3f} | Text: {text[:80]}...\n"
+                                  for comment_id, polarity, subjectivity, text in comment_rows)
+    elif comments_list is not None:
+         print("Comments file loaded but contains no comments.")
     else:
         print("Could not load or process comments.")
 
-    # Note: In a real pipeline, transcript_sentiments and comment_sentiments
-    # would be saved to MongoDB or prepared for loading into Snowflake.
-    print("\nSentiment analysis finished.")
-    # Example: Show first few results stored in lists
-    # print("\nSample Transcript Sentiment Data Structure:")
-    # print(transcript_sentiments[:2])
-    # print("\nSample Comment Sentiment Data Structure:")
-    # print(comment_sentiments[:2])
+    print(f"\nSentiment analysis finished for {video_id}.")
 
-    print("\nScript finished.")
+    # --- Save Results ---
+    # Columnar Parquet keeps the float16 scores and dictionary-encodes video_id; these
+    # files can be bulk-loaded into Snowflake or read back with pd.read_parquet
+    save_sentiment_table(transcript_sentiments, SENTIMENT_DIR / f"{video_id}_transcript_sentiment.parquet")
+    if comment_sentiments is not None:
+        save_sentiment_table(comment_sentiments, SENTIMENT_DIR / f"{video_id}_comment_sentiment.parquet")
 
+# --- Main Execution ---
+if __name__ == "__main__":
+    # --- Load Environment Variables (Optional for this script, but good practice) ---
+    # Only loaded when run as a script, so importing this module has no side effects
+    load_dotenv(BASE_DIR / ".env")
+    VERBOSE = os.getenv("VERBOSE", "1") == "1" # Set VERBOSE=0 to skip the per-row result listing
 
-    
\ No newline at end of file
+    print("--- Text Sentiment Analysis Script ---")
+
+    # --- Select Videos to Process ---
+    # Each video ID needs a transcript file with the SAME ID (see below)
+    TEST_VIDEO_ID = "bcGxg3c1HE8" # <<< MAKE SURE THIS MATCHES THE TRANSCRIPT FILE
+
+    parser = argparse.ArgumentParser(description="Scores transcript segments and comments for one or more videos.")
+    parser.add_argument("video_ids", nargs="*", default=[TEST_VIDEO_ID], help=f"Video IDs to analyze (default: {TEST_VIDEO_ID})")
+    parser.add_argument("--transcript", type=Path, default=None,
+                        help="JSON list of transcript segments for a single video (default: data/transcripts/<video_id>.json)")
+    args = parser.parse_args()
+    if args.transcript and len(args.video_ids) > 1:
+        parser.error("--transcript can only be used with a single video ID")
+
+    # --- Load Comments for All Videos Concurrently ---
+    comments_by_video = load_comments_for_videos(args.video_ids, COMMENTS_DIR)
+
+    for video_id in args.video_ids:
+        # --- Load Transcript Segments ---
+        # Save the 'segments' list output from running process_audio.py for each video
+        # to data/transcripts/<video_id>.json, or pass its path with --transcript.
+        # Example structure: [{"start": 0.0, "end": 1.92, "text": " Segment text..."}, ...]
+        transcript_path = args.transcript or TRANSCRIPTS_DIR / f"{video_id}.json"
+        transcript_segments = load_transcript_segments(transcript_path) or []
+        analyze_video(video_id, transcript_segments, comments_by_video[video_id], verbose=VERBOSE)
+
+    print("\nScript finished.")
@@ -1,7 +1,7 @@
 # src/persistence/mongo_utils.py
 
 import os
-from pymongo import MongoClient
+from pymongo import MongoClient, DeleteMany, InsertOne, WriteConcern
 from pymongo.errors import ConnectionFailure, OperationFailure, ConfigurationError
 from datetime import datetime, timezone # Use timezone-aware UTC
 import logging
@@ -11,6 +11,15 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(name)s] %(message)s')
 log = logging.getLogger(__name__)
 
+# Fire-and-forget write concern for derived collections (transcripts, comments) that can be
+# regenerated by re-running the pipeline; skips the per-write acknowledgement round-trip.
+# The authoritative 'videos' and 'scenes' collections keep the default acknowledged writes.
+UNACKNOWLEDGED_WRITES = WriteConcern(w=0)
+
+# Databases whose indexes were already ensured in this process (create_index is idempotent,
+# but each call is still a round-trip)
+_indexed_databases = set()
+
 def get_mongo_client(connection_string):
     """Establishes connection to MongoDB and returns the client object."""
     if not connection_string:
@@ -45,13 +54,36 @@ def get_mongo_database(client, db_name):
         return None
     try:
         db = client[db_name]
+        if db_name not in _indexed_databases and ensure_indexes(db):
+            _indexed_databases.add(db_name)
         return db
     except Exception as e:
         log.error(f"Error getting MongoDB database '{db_name}': {e}", exc_info=True)
         return None
 
-def save_video_metadata(db, video_data):
-    """Saves or updates video metadata in the 'videos' collection."""
+def ensure_indexes(db):
+    """
+    Creates the video_id indexes used by every save function's filter (update_one/replace_one
+    upserts and the delete before re-inserting), so those don't scan the whole collection.
+    """
+    if db is None:
+        log.error("Cannot create indexes: DB object invalid.")
+        return False
+    try:
+        db['videos'].create_index('video_id', unique=True)
+        db['scenes'].create_index('video_id', unique=True)
+        db['transcripts'].create_index([('video_id', 1), ('segment_index', 1)])
+        db['comments'].create_index('video_id')
+        return True
+    except OperationFailure as e:
+        log.warning(f"MongoDB OperationFailure creating indexes: {e.details}", exc_info=True)
+        return False
+
+def save_video_metadata(db, video_data, timestamp=None):
+    """
+    Saves or updates video metadata in the 'videos' collection.
+    Pass timestamp to share one 'last_updated' value across a batch of saves.
+    """
     # --- CORRECTED CHECK ---
     if db is None:
         log.error("Cannot save video metadata: DB object invalid.")
@@ -63,7 +95,7 @@ def save_video_metadata(db, video_data):
 
     collection = db['videos']
     video_id = video_data['video_id']
-    video_data['last_updated'] = datetime.now(timezone.utc) # Add/update timestamp
+    video_data['last_updated'] = timestamp or datetime.now(timezone.utc) # Add/update timestamp
 
     try:
         result = collection.update_one(
@@ -81,7 +113,7 @@ def save_video_metadata(db, video_data):
         log.error(f"Unexpected error saving video metadata for {video_id}: {e}", exc_info=True)
         return False
 
-def save_scene_data(db, video_id, scene_timestamps):
+def save_scene_data(db, video_id, scene_timestamps, timestamp=None):
     """Saves scene change timestamps for a video, replacing existing data."""
     # --- CORRECTED CHECK ---
     if db is None:
@@ -99,7 +131,7 @@ def save_scene_data(db, video_id, scene_timestamps):
     doc = {
         'video_id': video_id,
         'scene_change_timestamps_sec': scene_timestamps,
-        'last_updated': datetime.now(timezone.utc)
+        'last_updated': timestamp or datetime.now(timezone.utc)
     }
     try:
         result = collection.replace_one({'video_id': video_id}, doc, upsert=True)
@@ -113,8 +145,12 @@ def save_scene_data(db, video_id, scene_timestamps):
         log.error(f"Unexpected error saving scene data for {video_id}: {e}", exc_info=True)
         return False
 
-def save_transcript_segments(db, video_id, transcript_segments):
-    """Saves transcript segments (incl. sentiment) for a video. Deletes old before inserting."""
+def save_transcript_segments(db, video_id, transcript_segments, timestamp=None):
+    """
+    Saves transcript segments (incl. sentiment) for a video. Deletes old before inserting.
+    The segment dicts are updated in place (video_id, segment_index, last_updated, _id)
+    instead of being copied, so callers should pass dicts they don't reuse.
+    """
     # --- CORRECTED CHECK ---
     if db is None:
         log.error("Cannot save transcript: DB object invalid.")
@@ -127,18 +163,17 @@ def save_transcript_segments(db, video_id, transcript_segments):
         log.error(f"Invalid transcript_segments for {video_id}: Must be a list.")
         return False
 
-    collection = db['transcripts']
-    timestamp = datetime.now(timezone.utc)
+    collection = db.get_collection('transcripts', write_concern=UNACKNOWLEDGED_WRITES) # Regeneratable, no ack needed
+    timestamp = timestamp or datetime.now(timezone.utc)
 
     # Add video_id and timestamp to each segment before inserting
     processed_segments = []
     for i, segment in enumerate(transcript_segments):
         if isinstance(segment, dict):
-             segment_doc = segment.copy() # Avoid modifying original list dicts
-             segment_doc['video_id'] = video_id
-             segment_doc['segment_index'] = i # Add an index for ordering
-             segment_doc['last_updated'] = timestamp
-             processed_segments.append(segment_doc)
+             segment['video_id'] = video_id
+             segment['segment_index'] = i # Add an index for ordering
+             segment['last_updated'] = timestamp
+             processed_segments.append(segment)
         else:
              log.warning(f"Skipping invalid segment data for {video_id} at index {i}: {segment}")
 
@@ -148,18 +183,12 @@ def save_transcript_segments(db, video_id, transcript_segments):
          # return False # Or proceed to delete/insert empty
 
     try:
-        # Delete existing segments for this video first to prevent duplicates
-        del_result = collection.delete_many({'video_id': video_id})
-        # Optional: log.info(f"Deleted {del_result.deleted_count} old transcript segments for {video_id}.")
-
-        # Insert new segments if any exist
-        if processed_segments:
-            insert_result = collection.insert_many(processed_segments)
-            # Optional: log.info(f"Inserted {len(insert_result.inserted_ids)} new transcript segments for {video_id}.")
-            pass
-        else:
-            # Optional: log.info(f"No new transcript segments to insert for {video_id}.")
-            pass
+        # Delete existing segments for this video and insert the new ones in a single
+        # bulk_write round-trip. ordered=True keeps the delete ahead of the inserts, so a
+        # re-run never leaves duplicates (pymongo still splits large batches as needed)
+        ops = [DeleteMany({'video_id': video_id})] + [InsertOne(doc) for doc in processed_segments]
+        bulk_result = collection.bulk_write(ops, ordered=True)
+        # Unacknowledged write: bulk_result has no counts and server-side errors are not reported
 
         return True # Return True even if no segments were inserted (e.g., empty transcript)
     except OperationFailure as e:
@@ -169,8 +198,13 @@ def save_transcript_segments(db, video_id, transcript_segments):
         log.error(f"Unexpected error saving transcript for {video_id}: {e}", exc_info=True)
         return False
 
-def save_comment_sentiments(db, video_id, comment_sentiments):
-    """Saves comments with sentiment for a video. Deletes old before inserting."""
+def save_comment_sentiments(db, video_id, comment_sentiments, timestamp=None, replace=True):
+    """
+    Saves comments with sentiment for a video. Deletes old before inserting.
+    Like save_transcript_segments, the comment dicts are updated in place rather than copied.
+    To save a large list in batches, pass replace=True for the first batch only; later batches
+    (replace=False) are appended with an unordered insert_many.
+    """
     # --- CORRECTED CHECK ---
     if db is None:
         log.error("Cannot save comments: DB object invalid.")
@@ -183,16 +217,16 @@ def save_comment_sentiments(db, video_id, comment_sentiments):
         log.error(f"Invalid comment_sentiments for {video_id}: Must be a list.")
         return False
 
-    collection = db['comments'] # Use a dedicated collection for comments with sentiment
-    timestamp = datetime.now(timezone.utc)
+    # Use a dedicated collection for comments with sentiment (regeneratable, no ack needed)
+    collection = db.get_collection('comments', write_concern=UNACKNOWLEDGED_WRITES)
+    timestamp = timestamp or datetime.now(timezone.utc)
 
     processed_comments = []
     for i, comment_data in enumerate(comment_sentiments):
          if isinstance(comment_data, dict):
-             comment_doc = comment_data.copy()
-             comment_doc['video_id'] = video_id
-             comment_doc['last_updated'] = timestamp
-             processed_comments.append(comment_doc)
+             comment_data['video_id'] = video_id
+             comment_data['last_updated'] = timestamp
+             processed_comments.append(comment_data)
          else:
              log.warning(f"Skipping invalid comment data for {video_id} at index {i}: {comment_data}")
 
@@ -202,17 +236,13 @@ def save_comment_sentiments(db, video_id, comment_sentiments):
         # return False
 
     try:
-        # Delete existing comments for this video in this collection
-        del_result = collection.delete_many({'video_id': video_id})
-        # Optional: log.info(f"Deleted {del_result.deleted_count} old comments for {video_id}.")
-
-        if processed_comments:
-            insert_result = collection.insert_many(processed_comments)
-            # Optional: log.info(f"Inserted {len(insert_result.inserted_ids)} new comments for {video_id}.")
-            pass
-        else:
-            # Optional: log.info(f"No new comments to insert for {video_id}.")
-            pass
+        if replace:
+            # Replace this video's comments in one ordered bulk_write (delete, then inserts)
+            ops = [DeleteMany({'video_id': video_id})] + [InsertOne(doc) for doc in processed_comments]
+            bulk_result = collection.bulk_write(ops, ordered=True)
+        elif processed_comments:
+            # Appended batch: nothing to order against, so the server may apply the inserts in any order
+            collection.insert_many(processed_comments, ordered=False) # No bypass_document_validation: pymongo rejects it with w=0
 
         return True # Return True even if no comments were inserted
     except OperationFailure as e:
@@ -1,7 +1,11 @@
 # src/persistence/s3_utils.py
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import logging # Use logging instead of just print
 
@@ -9,25 +13,62 @@ import logging # Use logging instead of just print
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
+# --- Transfer Settings ---
+# Video files are usually 50-500 MB; larger parts and more concurrent part transfers (ranged
+# GETs for downloads) than boto3's defaults (8 MB / 10 threads) keep a fast link saturated
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=32,
+    use_threads=True
+)
+
+# download_s3_object_ranged: objects above RANGED_DOWNLOAD_MIN_SIZE are fetched as parallel
+# 16 MiB byte-range GETs written straight into place with os.pwrite (no temp file / rename)
+RANGED_PART_SIZE = 16 * 1024 * 1024
+RANGED_CONCURRENCY = 8
+RANGED_DOWNLOAD_MIN_SIZE = 32 * 1024 * 1024
+RANGED_READ_SIZE = 1024 * 1024 # Bytes read from each response body per pwrite
+
+# Connection pool sized above the transfer concurrency (botocore's default is 10), so parallel
+# part transfers and concurrent callers don't queue for a socket; adaptive retries back off on throttling
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive', 'max_attempts': 10}
+)
+
+# --- Shared Session / Clients ---
+# One session for the process and one client per (credentials, region): clients are thread-safe
+# and reusing them keeps their pooled keep-alive HTTPS connections (no new TLS handshakes)
+_session = boto3.session.Session()
+_s3_client_cache = {}
+_s3_client_lock = threading.Lock() # Sessions are not thread-safe; guard client creation
 
 def get_s3_client(aws_access_key_id, aws_secret_access_key, region_name):
-    """Initializes and returns an S3 client."""
+    """Initializes and returns an S3 client, reusing the cached one for the same credentials/region."""
     if not all([aws_access_key_id, aws_secret_access_key, region_name]):
         log.error("AWS credentials or region not fully provided.")
         return None
-    try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-            region_name=region_name
-        )
-        log.info(f"S3 client initialized for region {region_name}.")
-        # Optional: Add a check like head_bucket here if needed, but might be better in main script
-        return s3_client
-    except Exception as e:
-        log.error(f"Error initializing S3 client: {e}", exc_info=True)
-        return None
+    cache_key = (aws_access_key_id, aws_secret_access_key, region_name)
+    with _s3_client_lock:
+        if cache_key in _s3_client_cache:
+            return _s3_client_cache[cache_key]
+        try:
+            s3_client = _session.client(
+                's3',
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                region_name=region_name,
+                config=S3_CLIENT_CONFIG
+            )
+            log.info(f"S3 client initialized for region {region_name}.")
+            # Optional: Add a check like head_bucket here if needed, but might be better in main script
+            _s3_client_cache[cache_key] = s3_client
+            return s3_client
+        except Exception as e:
+            log.error(f"Error initializing S3 client: {e}", exc_info=True)
+            return None
 
 def download_s3_object(s3_client, bucket, s3_key, local_dir):
     """Downloads an object from S3 to a local temporary directory."""
@@ -49,7 +90,7 @@ def download_s3_object(s3_client, bucket, s3_key, local_dir):
 
     log.info(f"Attempting to download s3://{bucket}/{s3_key} to {local_filepath}...")
     try:
-        s3_client.download_file(bucket, s3_key, local_filepath)
+        s3_client.download_file(bucket, s3_key, local_filepath, Config=TRANSFER_CONFIG)
         log.info(f"Successfully downloaded object to {local_filepath}")
         return local_filepath
     except ClientError as e:
@@ -65,6 +106,73 @@ def download_s3_object(s3_client, bucket, s3_key, local_dir):
         log.error(f"Unexpected error during S3 download: {e}", exc_info=True)
         return None
 
+def download_s3_object_ranged(s3_client, bucket, s3_key, local_dir,
+                              part_size=RANGED_PART_SIZE, concurrency=RANGED_CONCURRENCY,
+                              min_size=RANGED_DOWNLOAD_MIN_SIZE):
+    """
+    Downloads an object from S3 as concurrent byte-range GETs into a preallocated local file.
+    Objects of min_size bytes or less are passed to download_s3_object.
+    Returns the local file path, or None on failure.
+    """
+    if not s3_client:
+        log.error("Cannot download S3 object: S3 client not initialized.")
+        return None
+    if not bucket or not s3_key:
+        log.error("Cannot download S3 object: Bucket name or S3 key is missing.")
+        return None
+
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=s3_key)
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code')
+        if error_code == "404":
+            log.error(f"S3 object s3://{bucket}/{s3_key} not found.")
+        elif error_code == "403":
+            log.error(f"Access Denied reading s3://{bucket}/{s3_key}. Check permissions.")
+        else:
+            log.error(f"ClientError reading S3 object metadata: {e}", exc_info=True)
+        return None
+    except Exception as e: # EndpointConnectionError, read timeouts and other BotoCoreErrors
+        log.error(f"Unexpected error reading S3 object metadata for s3://{bucket}/{s3_key}: {e}", exc_info=True)
+        return None
+    object_size = head['ContentLength']
+    if object_size <= min_size:
+        return download_s3_object(s3_client, bucket, s3_key, local_dir)
+
+    local_filepath = os.path.join(local_dir, os.path.basename(s3_key))
+    log.info(f"Downloading s3://{bucket}/{s3_key} ({object_size / 2**20:.0f} MiB) to {local_filepath} "
+             f"in {part_size // 2**20} MiB ranges ({concurrency} parallel)...")
+    fd = None
+    try:
+        os.makedirs(local_dir, exist_ok=True)
+        fd = os.open(local_filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(fd, object_size) # Preallocate so every part can be written at its offset
+
+        def fetch_range(start):
+            end = min(start + part_size, object_size) - 1
+            # IfMatch fails the part (412) if the object is replaced mid-download
+            body = s3_client.get_object(Bucket=bucket, Key=s3_key, Range=f"bytes={start}-{end}",
+                                        IfMatch=head['ETag'])['Body']
+            offset = start
+            for chunk in body.iter_chunks(RANGED_READ_SIZE):
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+            if offset != end + 1:
+                raise IOError(f"Short read for bytes {start}-{end}: got {offset - start} bytes")
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(fetch_range, range(0, object_size, part_size))) # Re-raises the first failure
+        log.info(f"Successfully downloaded object to {local_filepath}")
+        return local_filepath
+    except Exception as e:
+        log.error(f"Error during ranged S3 download of s3://{bucket}/{s3_key}: {e}", exc_info=True)
+        if fd is not None and os.path.exists(local_filepath):
+            os.remove(local_filepath) # Don't leave a partially written file behind
+        return None
+    finally:
+        if fd is not None:
+            os.close(fd)
+
 def upload_to_s3(s3_client, local_file_path, bucket, s3_key):
     """Uploads a file to an S3 bucket."""
     if not s3_client:
@@ -79,7 +187,7 @@ def upload_to_s3(s3_client, local_file_path, bucket, s3_key):
 
     log.info(f"Uploading {os.path.basename(local_file_path)} to s3://{bucket}/{s3_key}...")
     try:
-        s3_client.upload_file(local_file_path, bucket, s3_key)
+        s3_client.upload_file(local_file_path, bucket, s3_key, Config=TRANSFER_CONFIG)
         s3_url = f"s3://{bucket}/{s3_key}"
         log.info(f"Successfully uploaded to {s3_url}")
         return s3_url
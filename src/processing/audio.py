@@ -1,16 +1,26 @@
 # src/processing/audio.py
 
-import whisper
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+import ctranslate2 # Installed with faster-whisper; used to detect a CUDA device
 import os
 import time
+import threading
 import warnings
 import logging
 
+try:
+    # Optional: OpenVINO GenAI Whisper pipeline for Intel NPU/iGPU/CPU (pip install openvino-genai)
+    import openvino_genai
+except ImportError:
+    openvino_genai = None
+
+from .whisper_worker import get_whisper_client
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
 # Suppress specific known warnings from Whisper if needed
-# warnings.filterwarnings("ignore", category=UserWarning, module='whisper.transcribe')
+# warnings.filterwarnings("ignore", category=UserWarning, module='faster_whisper.transcribe')
 warnings.filterwarnings("ignore") # Suppress all user warnings for cleaner logs for now
 
 
@@ -18,12 +28,62 @@ warnings.filterwarnings("ignore") # Suppress all user warnings for cleaner logs
 DEFAULT_WHISPER_MODEL = "tiny.en" # Faster for testing
 # DEFAULT_WHISPER_MODEL = "base.en" # Good balance
 
+# faster-whisper runs Whisper on CTranslate2: INT8 GEMMs on CPU (~4x FP32 throughput, half the
+# memory), INT8 weights with FP16 activations on GPU (less VRAM and bandwidth than plain FP16)
+USE_CUDA = ctranslate2.get_cuda_device_count() > 0
+WHISPER_DEVICE = "cuda" if USE_CUDA else "cpu"
+WHISPER_COMPUTE_TYPE = "int8_float16" if USE_CUDA else "int8"
+WHISPER_NUM_WORKERS = 2 # Model replicas/queues, so transcribe calls from two threads run in parallel
+# cpu_threads is per replica, so split the cores between them instead of giving each all of them
+# (run_batch_pipeline splits its per-process share the same way)
+WHISPER_CPU_THREADS = max(1, (os.cpu_count() or 1) // WHISPER_NUM_WORKERS)
+
+# Silero VAD pre-filter (bundled with faster-whisper): silent stretches are dropped before the
+# encoder runs, and the emitted segment timestamps are mapped back to the original timeline
+WHISPER_VAD_FILTER = True
+WHISPER_VAD_PARAMETERS = {'min_silence_duration_ms': 500} # Don't split speech on short pauses
+
+# Set WHISPER_WORKER=1 to run transcribe_audio in a long-lived worker process that loads the
+# model once and keeps it across calls (see whisper_worker.py)
+USE_WHISPER_WORKER = os.getenv("WHISPER_WORKER", "0") == "1"
+
+# Set USE_OPENVINO=1 to run Whisper through OpenVINO GenAI instead of faster-whisper. The model
+# must be converted to OpenVINO IR once, e.g.:
+#   optimum-cli export openvino --model openai/whisper-tiny.en data/models/whisper-tiny.en-ov
+# CACHE_DIR stores the compiled model blob, so later loads skip device compilation.
+USE_OPENVINO = os.getenv("USE_OPENVINO", "0") == "1"
+OPENVINO_DEVICE = os.getenv("OPENVINO_DEVICE", "NPU") # "NPU", "GPU" or "CPU"
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OPENVINO_MODEL_DIR = os.path.join(PROJECT_ROOT, "data", "models") # Holds whisper-<model_name>-ov/
+OPENVINO_CACHE_DIR = os.path.join(OPENVINO_MODEL_DIR, ".ov_cache")
+WHISPER_SAMPLE_RATE = 16000
+
+# Set WHISPER_STREAMING=1 to transcribe through transcribe_long: a bounded audio buffer that is
+# re-decoded every STREAM_STEP_S seconds, committing words once two consecutive passes agree
+# (LocalAgreement-2) and trimming the buffer at the last committed word
+USE_STREAMING_TRANSCRIPTION = os.getenv("WHISPER_STREAMING", "0") == "1"
+STREAM_STEP_S = 5
+STREAM_WINDOW_S = 30
+STREAM_PROMPT_CHARS = 200 # Tail of committed text passed as the prompt for the next pass
+
 # Global variable to cache the loaded model
 # Be cautious with globals in more complex scenarios (e.g., multiprocessing)
 _whisper_model_cache = {}
+_whisper_model_lock = threading.Lock() # Held across check-load-store so concurrent callers share one load
+_batched_pipeline_cache = {} # BatchedInferencePipeline wrappers around the cached models
+
+DEFAULT_BATCH_SIZE = 16 # VAD chunks decoded per batch in transcribe_audio_batch
 
 def load_whisper_model(model_name=DEFAULT_WHISPER_MODEL):
-    """Loads a Whisper model, caching it for efficiency."""
+    """
+    Loads a Whisper model, caching it for efficiency. Thread-safe: concurrent callers wait for
+    the one load in progress instead of each loading a copy.
+    """
+    with _whisper_model_lock:
+        return _load_whisper_model(model_name)
+
+def _load_whisper_model(model_name):
+    """load_whisper_model's body; call with _whisper_model_lock held."""
     global _whisper_model_cache
     if model_name in _whisper_model_cache:
         # log.info(f"Using cached Whisper model '{model_name}'.")
@@ -32,28 +92,82 @@ def load_whisper_model(model_name=DEFAULT_WHISPER_MODEL):
     log.info(f"Loading Whisper model '{model_name}'...")
     start_time = time.time()
     try:
+        if USE_OPENVINO and openvino_genai is not None:
+            model_dir = os.path.join(OPENVINO_MODEL_DIR, f"whisper-{model_name}-ov")
+            model = openvino_genai.WhisperPipeline(model_dir, OPENVINO_DEVICE, CACHE_DIR=OPENVINO_CACHE_DIR)
+            log.info(f"Model '{model_name}' loaded with OpenVINO on {OPENVINO_DEVICE} in {time.time() - start_time:.2f} seconds.")
+            _whisper_model_cache[model_name] = model
+            return model
+        if USE_OPENVINO:
+            log.warning("USE_OPENVINO is set but openvino-genai is not installed. Using faster-whisper.")
+
         # Consider specifying download_root if needed
-        model = whisper.load_model(model_name)
+        model = WhisperModel(
+            model_name,
+            device=WHISPER_DEVICE,
+            compute_type=WHISPER_COMPUTE_TYPE,
+            cpu_threads=WHISPER_CPU_THREADS,
+            num_workers=WHISPER_NUM_WORKERS
+        )
         load_time = time.time() - start_time
         log.info(f"Model '{model_name}' loaded in {load_time:.2f} seconds.")
         _whisper_model_cache[model_name] = model # Cache the loaded model
         return model
     except Exception as e:
         log.error(f"Error loading Whisper model '{model_name}': {e}", exc_info=True)
-        log.error("Ensure the model name is correct, dependencies (like torch) are installed,")
+        log.error("Ensure the model name is correct, dependencies (faster-whisper/ctranslate2) are installed,")
         log.error("and you have internet access if downloading for the first time.")
         return None
 
+def _build_result(segments, info):
+    """
+    Consumes faster-whisper's lazy segment generator (decoding happens here) and returns the
+    openai-whisper style result dict the rest of the pipeline expects.
+    """
+    result_segments = [
+        {'id': segment.id, 'start': segment.start, 'end': segment.end, 'text': segment.text}
+        for segment in segments
+    ]
+    return {
+        'text': "".join(segment['text'] for segment in result_segments),
+        'segments': result_segments,
+        'language': info.language
+    }
+
+def _is_openvino_model(model):
+    return openvino_genai is not None and isinstance(model, openvino_genai.WhisperPipeline)
+
+def _transcribe_openvino(model, video_path):
+    """Transcribes with an OpenVINO WhisperPipeline, returning transcribe_audio's result format."""
+    audio_samples = decode_audio(video_path, sampling_rate=WHISPER_SAMPLE_RATE) # float32 mono
+    output = model.generate(audio_samples.tolist(), return_timestamps=True)
+    result_segments = [
+        {'id': i, 'start': chunk.start_ts, 'end': chunk.end_ts, 'text': chunk.text}
+        for i, chunk in enumerate(output.chunks or [])
+    ]
+    return {
+        'text': output.texts[0] if output.texts else "",
+        'segments': result_segments,
+        'language': None # Not reported by the OpenVINO pipeline
+    }
+
 
 def transcribe_audio(video_path, model_name=DEFAULT_WHISPER_MODEL):
     """
     Transcribes the audio from a video file using Whisper.
-    Returns the structured transcription result including segments.
+    Returns the structured transcription result including segments, in the same shape as
+    openai-whisper's: {"text": ..., "segments": [{"id", "start", "end", "text"}, ...], "language": ...}.
     """
     if not os.path.exists(video_path):
         log.error(f"Video file not found at {video_path} for transcription.")
         return None
 
+    if USE_WHISPER_WORKER:
+        return get_whisper_client(model_name).transcribe(video_path)
+    return transcribe_audio_in_process(video_path, model_name)
+
+def transcribe_audio_in_process(video_path, model_name=DEFAULT_WHISPER_MODEL):
+    """transcribe_audio's body, run with the model cached in this process (also used by the worker)."""
     model = load_whisper_model(model_name)
     if not model:
         log.error("Transcription failed: Whisper model could not be loaded.")
@@ -62,9 +176,16 @@ def transcribe_audio(video_path, model_name=DEFAULT_WHISPER_MODEL):
     log.info(f"Starting transcription for: {os.path.basename(video_path)} using model '{model_name}'...")
     start_time = time.time()
     try:
-        # Process with fp16=False for better CPU compatibility. Set verbose=None for default progress.
+        # Precision is fixed by WHISPER_COMPUTE_TYPE at load time. Greedy decoding (beam_size=1)
         # Consider language= "en" if using multilingual model but expect english
-        result = model.transcribe(video_path, fp16=False, verbose=None) # verbose=None is whisper default
+        if _is_openvino_model(model):
+            result = _transcribe_openvino(model, video_path)
+        elif USE_STREAMING_TRANSCRIPTION:
+            result = transcribe_long(video_path, model_name=model_name)
+        else:
+            segments, info = model.transcribe(video_path, beam_size=1,
+                                              vad_filter=WHISPER_VAD_FILTER, vad_parameters=WHISPER_VAD_PARAMETERS)
+            result = _build_result(segments, info)
         end_time = time.time()
         log.info(f"Transcription finished in {end_time - start_time:.2f} seconds.")
         # result dictionary contains 'text' and 'segments' keys
@@ -75,4 +196,140 @@ def transcribe_audio(video_path, model_name=DEFAULT_WHISPER_MODEL):
     except Exception as e:
         log.error(f"Error during transcription: {e}", exc_info=True)
         log.error("Ensure ffmpeg is installed correctly and accessible in your PATH.")
-        return None
\ No newline at end of file
+        return None
+
+def _normalize_word(word):
+    return word.strip().strip(".,!?;:\"'").lower()
+
+def _words_to_segment(segment_id, words):
+    return {
+        'id': segment_id,
+        'start': words[0][0],
+        'end': words[-1][1],
+        'text': "".join(word[2] for word in words)
+    }
+
+def transcribe_long(audio_path, step_s=STREAM_STEP_S, window_s=STREAM_WINDOW_S, model_name=DEFAULT_WHISPER_MODEL):
+    """
+    Transcribes long audio with a fixed-size buffer instead of one pass over the whole file.
+    Every step_s seconds of new audio the buffer (at most window_s seconds) is decoded with word
+    timestamps; the prefix on which this pass and the previous one agree is committed, and the
+    buffer is cut at the end of the last committed word. Decoding cost per step therefore stays
+    bounded by window_s regardless of the total length.
+    Returns a result dict in transcribe_audio's format (one segment per commit), or None on error.
+    """
+    model = load_whisper_model(model_name)
+    if not model:
+        log.error("Transcription failed: Whisper model could not be loaded.")
+        return None
+    if _is_openvino_model(model):
+        return _transcribe_openvino(model, audio_path) # No word timestamps to agree on
+
+    try:
+        audio_samples = decode_audio(audio_path, sampling_rate=WHISPER_SAMPLE_RATE)
+    except Exception as e:
+        log.error(f"Error decoding audio from {audio_path}: {e}", exc_info=True)
+        return None
+
+    step_samples = int(step_s * WHISPER_SAMPLE_RATE)
+    window_samples = int(window_s * WHISPER_SAMPLE_RATE)
+    buffer_start = 0 # Sample index in audio_samples where audio_buffer begins
+    position = 0 # Samples fed so far
+    hypothesis = [] # Uncommitted (start, end, text) words from the previous pass
+    committed_text = ""
+    last_committed_word = ""
+    segments = []
+    language = None
+
+    while position < len(audio_samples):
+        position = min(position + step_samples, len(audio_samples))
+        is_last = position == len(audio_samples)
+        audio_buffer = audio_samples[buffer_start:position]
+        offset = buffer_start / WHISPER_SAMPLE_RATE
+
+        pass_segments, info = model.transcribe(
+            audio_buffer, beam_size=1, word_timestamps=True,
+            condition_on_previous_text=False, initial_prompt=committed_text[-STREAM_PROMPT_CHARS:] or None,
+            vad_filter=WHISPER_VAD_FILTER, vad_parameters=WHISPER_VAD_PARAMETERS
+        )
+        words = [(offset + word.start, offset + word.end, word.word)
+                 for segment in pass_segments for word in (segment.words or [])]
+        language = language or info.language
+        # The cut can leave the tail of the last committed word at the buffer start; don't repeat it
+        if words and segments and _normalize_word(words[0][2]) == _normalize_word(last_committed_word) \
+                and words[0][0] - offset < 1.0:
+            words = words[1:]
+
+        # LocalAgreement-2: commit the longest prefix shared with the previous pass
+        agreed = 0
+        while (agreed < len(words) and agreed < len(hypothesis)
+               and _normalize_word(words[agreed][2]) == _normalize_word(hypothesis[agreed][2])):
+            agreed += 1
+        commit = words if is_last else words[:agreed]
+        hypothesis = words[agreed:]
+
+        # Keep the buffer bounded when passes keep disagreeing: commit words that are
+        # already a full step behind the newest audio
+        if not is_last and position - buffer_start >= window_samples:
+            stable_until = position / WHISPER_SAMPLE_RATE - step_s
+            forced = [word for word in hypothesis if word[1] <= stable_until]
+            commit = commit + forced
+            hypothesis = hypothesis[len(forced):]
+            if not commit:
+                buffer_start = position - window_samples + step_samples # Nothing recognised; drop old audio
+                hypothesis = []
+
+        if commit:
+            segments.append(_words_to_segment(len(segments), commit))
+            committed_text += segments[-1]['text']
+            last_committed_word = commit[-1][2]
+            # Timestamp-guided trim: the next pass starts right after the last committed word
+            buffer_start = max(buffer_start, int(commit[-1][1] * WHISPER_SAMPLE_RATE))
+            # The remaining hypothesis is re-decoded from the trimmed buffer next pass
+            hypothesis = [word for word in hypothesis if word[0] >= commit[-1][1]]
+
+    return {
+        'text': committed_text,
+        'segments': segments,
+        'language': language
+    }
+
+
+def transcribe_audio_batch(video_paths, model_name=DEFAULT_WHISPER_MODEL, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Transcribes several video files with faster-whisper's BatchedInferencePipeline: each file
+    is split into speech chunks by VAD and the chunks are decoded batch_size at a time instead
+    of one 30-s window after another.
+    Returns a dict {video_path: result} in transcribe_audio's format (None for failed files).
+    """
+    model = load_whisper_model(model_name)
+    if not model:
+        log.error("Batch transcription failed: Whisper model could not be loaded.")
+        return {video_path: None for video_path in video_paths}
+    if _is_openvino_model(model):
+        # BatchedInferencePipeline only wraps faster-whisper models; transcribe one by one
+        return {video_path: transcribe_audio(video_path, model_name) for video_path in video_paths}
+
+    with _whisper_model_lock:
+        if model_name not in _batched_pipeline_cache:
+            _batched_pipeline_cache[model_name] = BatchedInferencePipeline(model=model)
+        batched_pipeline = _batched_pipeline_cache[model_name]
+
+    results = {}
+    for video_path in video_paths:
+        if not os.path.exists(video_path):
+            log.error(f"Video file not found at {video_path} for transcription.")
+            results[video_path] = None
+            continue
+
+        log.info(f"Starting batched transcription for: {os.path.basename(video_path)} (batch_size={batch_size})...")
+        start_time = time.time()
+        try:
+            segments, info = batched_pipeline.transcribe(video_path, batch_size=batch_size, beam_size=1,
+                                                         vad_filter=True, vad_parameters=WHISPER_VAD_PARAMETERS) # Batching needs VAD chunks
+            results[video_path] = _build_result(segments, info)
+            log.info(f"Transcription finished in {time.time() - start_time:.2f} seconds.")
+        except Exception as e:
+            log.error(f"Error during batched transcription of {video_path}: {e}", exc_info=True)
+            results[video_path] = None
+    return results
@@ -3,8 +3,23 @@
 import cv2
 import numpy as np
 import os
+import re
+import subprocess
 import logging
 
+try:
+    # PyAV decodes through libavcodec (optionally on NVDEC/VAAPI/VideoToolbox) and lets
+    # libswscale do resize + grayscale in one pass, so full-size BGR frames are never built
+    import av
+    from av.codec.hwaccel import HWAccel, hwdevices_available
+except ImportError:
+    av = None
+
+try:
+    from numba import njit, prange
+except ImportError: # Numba is optional; the cv2 absdiff/threshold path is used without it
+    njit = None
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
@@ -14,14 +29,223 @@ DEFAULT_RESIZE_WIDTH = 320
 DEFAULT_BLUR_KERNEL = (7, 7)
 DEFAULT_PIXEL_THRESHOLD = 20
 
+# Frame decoding: "auto" uses PyAV when installed, otherwise OpenCV ("pyav" / "opencv" to force one)
+DEFAULT_DECODER = "auto"
+# PyAV hardware decoder, e.g. "cuda", "vaapi", "videotoolbox", or "auto" to try HWACCEL_AUTO_ORDER
+# (None = CPU decode). Set from VIDEO_HWACCEL so a deployment can enable it without code changes.
+DEFAULT_HWACCEL = os.getenv("VIDEO_HWACCEL") or None
+HWACCEL_AUTO_ORDER = ("cuda", "vaapi", "qsv", "videotoolbox", "d3d11va")
+
+# Strided sampling (sampling_fps): only a few frames per second are compared, using 64-bin
+# gray histograms (robust to the motion between distant frames) instead of per-pixel differences
+HISTOGRAM_BINS = 64
+DEFAULT_HISTOGRAM_THRESHOLD = 0.35 # Bhattacharyya distance (0 = identical, 1 = disjoint)
+
+# ffmpeg scdet backend (use_ffmpeg=True): the score is a scaled mean absolute frame difference
+# on the luma plane (0-100), not a changed-pixel ratio, so it has its own threshold
+DEFAULT_SCDET_THRESHOLD = 10.0 # ffmpeg's own default
+# Frames are downscaled inside the same ffmpeg filter graph before scdet, so it compares far
+# fewer pixels per frame (the score is a mean, so the threshold is unaffected). None = full size.
+DEFAULT_SCDET_SCALE_WIDTH = 640
+SCDET_PATTERN = re.compile(r"lavfi\.scd\.score:\s*([\d.]+),\s*lavfi\.scd\.time:\s*([\d.]+)")
+
+# OpenCL (cv2.UMat) path for the pixel-difference detector: resize, gray conversion, blur and
+# differencing run on an OpenCL device (iGPU/dGPU) and only the changed-pixel count comes back
+# per frame. Used when OpenCV finds an OpenCL device; set SCENE_OPENCL=0 to keep the CPU path.
+USE_OPENCL = os.getenv("SCENE_OPENCL", "1") == "1" and cv2.ocl.haveOpenCL()
+if USE_OPENCL:
+    cv2.ocl.setUseOpenCL(True)
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, parallel=True) # cache=True keeps the compiled kernel on disk between runs
+    def changed_pixels_ratio_kernel(prev_gray, current_gray, pixel_threshold):
+        """
+        Fraction of pixels whose absolute difference exceeds pixel_threshold, in one pass over
+        both frames (replaces absdiff -> threshold -> count, which writes two full-size buffers).
+        """
+        height, width = prev_gray.shape
+        changed = 0
+        for i in prange(height):
+            row_changed = 0
+            for j in range(width):
+                if abs(np.int16(prev_gray[i, j]) - np.int16(current_gray[i, j])) > pixel_threshold:
+                    row_changed += 1
+            changed += row_changed
+        return changed / (height * width)
+
+    # Compile (or load from cache) at import so the JIT cost doesn't land on the first video
+    changed_pixels_ratio_kernel(np.zeros((2, 2), np.uint8), np.zeros((2, 2), np.uint8), DEFAULT_PIXEL_THRESHOLD)
+else:
+    changed_pixels_ratio_kernel = None
+
+def _changed_pixels_ratio(prev_gray, current_gray, pixel_threshold, scratch=None):
+    """
+    Fraction of pixels that changed by more than pixel_threshold between two gray frames.
+    scratch (same shape/dtype as the frames) is reused for the difference image when Numba is unavailable.
+    """
+    if changed_pixels_ratio_kernel is not None:
+        return changed_pixels_ratio_kernel(prev_gray, current_gray, pixel_threshold)
+    frame_diff = cv2.absdiff(prev_gray, current_gray, dst=scratch)
+    _, diff_thresh = cv2.threshold(frame_diff, pixel_threshold, 255, cv2.THRESH_BINARY, dst=frame_diff) # In place
+    return cv2.countNonZero(diff_thresh) / diff_thresh.size
+
+def _changed_pixels_ratio_opencl(prev_gray, current_gray, pixel_threshold, pixel_count):
+    """_changed_pixels_ratio for cv2.UMat frames; countNonZero is the only device-to-host copy."""
+    _, diff_thresh = cv2.threshold(cv2.absdiff(prev_gray, current_gray), pixel_threshold, 255, cv2.THRESH_BINARY)
+    return cv2.countNonZero(diff_thresh) / pixel_count
+
+def _read_gray_frames_opencv(cap, resize_width, stride=1, use_opencl=False):
+    """
+    Yields (frame_index, gray_frame) for every stride-th frame of an open cv2.VideoCapture,
+    downscaled to resize_width. Skipped frames are only grabbed, never converted to BGR.
+    The decode, resize and gray buffers are allocated once and reused, so each yielded frame
+    is only valid until the next one is requested.
+    With use_opencl, each decoded frame is uploaded once and cv2.UMat gray frames are yielded.
+    """
+    frame_index = 0
+    frame = current_frame_resized = current_frame_gray = None # Scratch buffers, reused via dst=
+    while True:
+        if frame_index % stride:
+            if not cap.grab():
+                break # End of video
+            frame_index += 1
+            continue
+        ret, frame = cap.read(frame)
+        if not ret:
+            # log.info("Finished processing video frames.")
+            break # End of video
+
+        if use_opencl:
+            yield frame_index, _to_gray_opencl(frame, resize_width)
+            frame_index += 1
+            continue
+
+        # 1. Resize for speed (optional)
+        if resize_width and frame.shape[1] > resize_width:
+            aspect_ratio = frame.shape[0] / frame.shape[1]
+            new_height = int(resize_width * aspect_ratio)
+            current_frame_resized = cv2.resize(frame, (resize_width, new_height), dst=current_frame_resized,
+                                               interpolation=cv2.INTER_AREA)
+            source = current_frame_resized
+        else:
+            source = frame
+
+        # 2. Convert to Grayscale
+        current_frame_gray = cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=current_frame_gray)
+        yield frame_index, current_frame_gray
+        frame_index += 1
+
+def _to_gray_opencl(frame, resize_width):
+    """Uploads a BGR frame and returns it resized and grayscaled as a cv2.UMat (ops run on the OpenCL device)."""
+    frame_u = cv2.UMat(frame)
+    if resize_width and frame.shape[1] > resize_width:
+        new_height = int(resize_width * frame.shape[0] / frame.shape[1])
+        frame_u = cv2.resize(frame_u, (resize_width, new_height), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame_u, cv2.COLOR_BGR2GRAY)
+
+def _read_gray_frames_pyav(container, stream, resize_width, stride=1):
+    """
+    Yields (frame_index, gray_frame) for every stride-th frame decoded by PyAV (resize + gray
+    conversion done by libswscale, and skipped for frames that aren't sampled).
+    """
+    new_width = new_height = None
+    for frame_index, frame in enumerate(container.decode(stream)):
+        if frame_index % stride:
+            continue
+        if new_width is None: # All frames of a stream share one size
+            if resize_width and frame.width > resize_width:
+                new_width, new_height = resize_width, int(resize_width * frame.height / frame.width)
+            else:
+                new_width, new_height = frame.width, frame.height
+        yield frame_index, frame.reformat(width=new_width, height=new_height, format='gray', interpolation='AREA').to_ndarray()
+
+def _open_pyav(video_path, hwaccel):
+    """Opens video_path with PyAV. Returns (container, video stream, fps) or None on failure."""
+    if hwaccel == "auto":
+        device_types = [device_type for device_type in HWACCEL_AUTO_ORDER if device_type in hwdevices_available()]
+    else:
+        device_types = [hwaccel] if hwaccel else []
+    try:
+        container = None
+        for device_type in device_types:
+            try:
+                # allow_software_fallback keeps decoding working for codecs the device can't handle
+                container = av.open(video_path, hwaccel=HWAccel(device_type=device_type, allow_software_fallback=True))
+                break
+            except av.FFmpegError as e:
+                log.warning(f"Hardware decoder '{device_type}' unavailable ({e}).")
+        if container is None:
+            if device_types:
+                log.warning("No hardware decoder could be opened. Decoding on the CPU.")
+            container = av.open(video_path)
+        stream = container.streams.video[0]
+        # Frame + slice threading in libavcodec: several frames decode in parallel across cores
+        # (PyAV defaults to a single decode thread)
+        stream.thread_type = "AUTO"
+    except (av.FFmpegError, IndexError, ValueError) as e:
+        log.error(f"Could not open video file {video_path} with PyAV: {e}")
+        if container is not None:
+            container.close() # Opened, but no usable video stream (e.g. audio-only)
+        return None
+    fps = float(stream.average_rate) if stream.average_rate else 0
+    return container, stream, fps
+
+def _detect_scenes_ffmpeg(video_path, scdet_threshold, min_scene_duration_sec, scale_width=DEFAULT_SCDET_SCALE_WIDTH):
+    """
+    Detects scene changes with ffmpeg's scdet filter in a single C pass over the decoded luma
+    plane (no BGR conversion, no per-frame Python). Returns a list of timestamps (seconds),
+    or None if ffmpeg is unavailable or fails so the caller can fall back to frame differencing.
+    """
+    video_filter = f'scdet=threshold={scdet_threshold}:sc_pass=0'
+    if scale_width:
+        # min() keeps smaller videos at their own size; -2 keeps the aspect ratio with an even height
+        video_filter = f"scale='min({scale_width},iw)':-2:flags=area," + video_filter
+    command = [
+        'ffmpeg', '-hide_banner', '-nostats',
+        '-hwaccel', 'auto', # Uses a hardware decoder when one is available
+        '-i', video_path,
+        '-vf', video_filter,
+        '-an', '-f', 'null', '-'
+    ]
+    try:
+        process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                 text=True, errors='replace')
+    except FileNotFoundError:
+        log.warning("ffmpeg not found in PATH. Falling back to frame differencing.")
+        return None
+    if process.returncode != 0:
+        log.warning(f"ffmpeg scdet failed for {os.path.basename(video_path)} (exit code {process.returncode}): "
+                    f"{process.stderr.strip()[-500:]}. Falling back to frame differencing.")
+        return None
+
+    # scdet logs one "lavfi.scd.score: S, lavfi.scd.time: T" line per detected cut
+    scene_change_timestamps = []
+    for match in SCDET_PATTERN.finditer(process.stderr):
+        timestamp_sec = float(match.group(2))
+        # Same debounce as frame differencing: ignore cuts closer than min_scene_duration_sec
+        if not scene_change_timestamps or timestamp_sec - scene_change_timestamps[-1] >= min_scene_duration_sec:
+            scene_change_timestamps.append(timestamp_sec)
+    return scene_change_timestamps
+
 def detect_scenes(video_path,
                   threshold=DEFAULT_FRAME_DIFFERENCE_THRESHOLD,
                   resize_width=DEFAULT_RESIZE_WIDTH,
                   blur_kernel=DEFAULT_BLUR_KERNEL,
                   pixel_threshold=DEFAULT_PIXEL_THRESHOLD,
-                  min_scene_duration_sec=0.5): # Heuristic to avoid rapid detections
+                  min_scene_duration_sec=0.5, # Heuristic to avoid rapid detections
+                  decoder=DEFAULT_DECODER,
+                  hwaccel=DEFAULT_HWACCEL,
+                  use_ffmpeg=False,
+                  scdet_threshold=DEFAULT_SCDET_THRESHOLD,
+                  scdet_scale_width=DEFAULT_SCDET_SCALE_WIDTH,
+                  sampling_fps=None,
+                  histogram_threshold=DEFAULT_HISTOGRAM_THRESHOLD):
     """
     Opens a video file and detects scene changes using frame differencing.
+    With sampling_fps (e.g. 2-4), only that many frames per second are compared, by gray
+    histogram distance against histogram_threshold; cut times are then accurate to ~1/sampling_fps.
+    With use_ffmpeg=True, ffmpeg's scdet filter (thresholded by scdet_threshold, on frames
+    scaled to scdet_scale_width) is used instead, falling back to frame differencing if the ffmpeg binary is unavailable.
     Returns a list of timestamps (in seconds) where scene changes are detected.
     """
     scene_change_timestamps = []
@@ -29,78 +253,113 @@ def detect_scenes(video_path,
         log.error(f"Video file not found at {video_path}")
         return scene_change_timestamps
 
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        log.error(f"Could not open video file {video_path}")
-        return scene_change_timestamps
+    if use_ffmpeg:
+        ffmpeg_timestamps = _detect_scenes_ffmpeg(video_path, scdet_threshold, min_scene_duration_sec, scdet_scale_width)
+        if ffmpeg_timestamps is not None:
+            log.info(f"Detected {len(ffmpeg_timestamps)} potential scene changes for {os.path.basename(video_path)} (ffmpeg scdet).")
+            return ffmpeg_timestamps
+
+    if decoder == "pyav" and av is None:
+        log.warning("PyAV is not installed; falling back to OpenCV decoding.")
+    use_pyav = decoder in ("auto", "pyav") and av is not None
+    if use_pyav:
+        opened = _open_pyav(video_path, hwaccel)
+        if opened is None:
+            return scene_change_timestamps
+        container, stream, fps = opened
+        release = container.close
+    else:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            log.error(f"Could not open video file {video_path}")
+            return scene_change_timestamps
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        release = cap.release
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
     if fps <= 0: # Check for invalid FPS
         log.warning(f"Invalid FPS ({fps}) detected for {os.path.basename(video_path)}. Assuming 30 FPS.")
         fps = 30 # Assume a default FPS
 
+    use_histograms = bool(sampling_fps)
+    stride = max(1, int(round(fps / sampling_fps))) if use_histograms else 1
+    use_opencl = USE_OPENCL and not use_histograms # Histograms are cheap on CPU at a few frames/s
+    if use_pyav:
+        frames = _read_gray_frames_pyav(container, stream, resize_width, stride)
+    else:
+        frames = _read_gray_frames_opencv(cap, resize_width, stride, use_opencl)
+
     min_scene_duration_frames = int(min_scene_duration_sec * fps) # Convert min duration to frames
     last_scene_cut_frame = -min_scene_duration_frames # Initialize to allow detection at start
 
-    prev_frame_gray = None
-    frame_count = 0
+    prev_frame_gray = None # Blurred frame, or its histogram when sampling
+    blur_buffer = diff_buffer = None # Reused per-frame buffers for the pixel-difference path
+    pixel_count = None # Frame size on the OpenCL path (UMat has no .size)
+    frame_count = 0 # Index of the current frame in the video
     detected_count = 0
 
-    log.info(f"Processing video: {os.path.basename(video_path)} at {fps:.2f} FPS for scene detection.")
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            # log.info("Finished processing video frames.")
-            break # End of video
+    log.info(f"Processing video: {os.path.basename(video_path)} at {fps:.2f} FPS for scene detection"
+             + (f" (sampling every {stride} frames)." if stride > 1 else "."))
 
-        # --- Frame Processing for Scene Detection ---
-        try:
-            # 1. Resize for speed (optional)
-            if resize_width and frame.shape[1] > resize_width:
-                aspect_ratio = frame.shape[0] / frame.shape[1]
-                new_height = int(resize_width * aspect_ratio)
-                current_frame_resized = cv2.resize(frame, (resize_width, new_height), interpolation=cv2.INTER_AREA)
+    # --- Frame Processing for Scene Detection ---
+    # Decoding, resizing and grayscale conversion happen in the frame generator
+    try:
+        for frame_count, current_frame_gray in frames:
+            if use_histograms:
+                # 3. Summarize the frame as a normalized 64-bin histogram (no blur needed)
+                current_frame_gray = cv2.calcHist([current_frame_gray], [0], None, [HISTOGRAM_BINS], [0, 256])
+                cv2.normalize(current_frame_gray, current_frame_gray)
+            elif use_opencl:
+                # 3. Blur on the OpenCL device; PyAV frames (already gray and small) are uploaded here
+                if not isinstance(current_frame_gray, cv2.UMat):
+                    current_frame_gray = cv2.UMat(current_frame_gray)
+                if pixel_count is None:
+                    pixel_count = current_frame_gray.get().size # One download per video
+                current_frame_gray = cv2.boxFilter(current_frame_gray, -1, blur_kernel, normalize=True)
             else:
-                current_frame_resized = frame
-
-            # 2. Convert to Grayscale
-            current_frame_gray = cv2.cvtColor(current_frame_resized, cv2.COLOR_BGR2GRAY)
-
-            # 3. Blur slightly to reduce noise
-            current_frame_gray = cv2.GaussianBlur(current_frame_gray, blur_kernel, 0)
+                # 3. Blur slightly to reduce noise (a box filter is enough before thresholded
+                # differencing and is cheaper than a Gaussian: running sums, no per-tap weights)
+                # The blur is written into the buffer of the frame before prev, so the loop
+                # allocates nothing per frame once the first two frames are in
+                if blur_buffer is None:
+                    blur_buffer = np.empty_like(current_frame_gray)
+                current_frame_gray = cv2.boxFilter(current_frame_gray, -1, blur_kernel, dst=blur_buffer, normalize=True)
 
             # 4. Compare with previous frame (if exists)
             if prev_frame_gray is not None:
                 # Check if enough frames passed since last cut
                 if frame_count >= last_scene_cut_frame + min_scene_duration_frames:
-                    frame_diff = cv2.absdiff(prev_frame_gray, current_frame_gray)
-                    _, diff_thresh = cv2.threshold(frame_diff, pixel_threshold, 255, cv2.THRESH_BINARY)
-                    changed_pixels_ratio = np.sum(diff_thresh > 0) / diff_thresh.size
+                    if use_histograms:
+                        is_cut = cv2.compareHist(prev_frame_gray, current_frame_gray, cv2.HISTCMP_BHATTACHARYYA) > histogram_threshold
+                    elif use_opencl:
+                        is_cut = _changed_pixels_ratio_opencl(prev_frame_gray, current_frame_gray, pixel_threshold, pixel_count) > threshold
+                    else:
+                        if diff_buffer is None and changed_pixels_ratio_kernel is None:
+                            diff_buffer = np.empty_like(current_frame_gray)
+                        is_cut = _changed_pixels_ratio(prev_frame_gray, current_frame_gray, pixel_threshold, diff_buffer) > threshold
 
-                    if changed_pixels_ratio > threshold:
+                    if is_cut:
                         timestamp_sec = frame_count / fps
                         scene_change_timestamps.append(timestamp_sec)
                         last_scene_cut_frame = frame_count # Record when this cut happened
                         detected_count += 1
-                        # log.info(f"  Scene change detected at frame {frame_count} ({timestamp_sec:.2f}s) - Ratio: {changed_pixels_ratio:.3f}")
+                        # log.info(f"  Scene change detected at frame {frame_count} ({timestamp_sec:.2f}s)")
 
-            # Update previous frame
+            # Update previous frame (swap buffers: the old previous frame is overwritten next)
+            if not use_histograms:
+                blur_buffer = prev_frame_gray
             prev_frame_gray = current_frame_gray
-            frame_count += 1
 
             # Optional: Display processing progress less frequently
             # if frame_count % 500 == 0:
             #     log.info(f"  Processed {frame_count} frames...")
 
-        except cv2.error as e:
-             log.error(f"OpenCV error processing frame {frame_count}: {e}", exc_info=True)
-             # Optionally decide whether to break or try to continue
-             break # Stop processing on OpenCV error for safety
-        except Exception as e:
-             log.error(f"Unexpected error processing frame {frame_count}: {e}", exc_info=True)
-             break # Stop processing on other errors
+    except cv2.error as e:
+         log.error(f"OpenCV error processing frame {frame_count}: {e}", exc_info=True)
+         # Stop processing on OpenCV error for safety (timestamps found so far are kept)
+    except Exception as e:
+         log.error(f"Unexpected error processing frame {frame_count}: {e}", exc_info=True)
+         # Stop processing on other errors (including decode errors)
 
-    cap.release() # Release the video capture object
+    release() # Release the video capture object / PyAV container
     log.info(f"Detected {detected_count} potential scene changes for {os.path.basename(video_path)}.")
-    return scene_change_timestamps
\ No newline at end of file
+    return scene_change_timestamps
@@ -0,0 +1,92 @@
+# src/processing/whisper_worker.py
+
+import atexit
+import logging
+import multiprocessing as mp
+import queue
+import threading
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+log = logging.getLogger(__name__)
+
+# How often a waiting client checks that the worker process is still alive (seconds)
+WORKER_POLL_INTERVAL_SEC = 1.0
+
+# One client (and worker process) per model name
+_whisper_client_cache = {}
+_whisper_client_lock = threading.Lock()
+
+
+def _worker_main(model_name, request_queue, response_queue):
+    """
+    Worker process: loads the Whisper model once, then transcribes each video path received
+    on request_queue until the None sentinel arrives.
+    """
+    from . import audio # Imported here so the parent doesn't need the model loaded
+
+    audio.load_whisper_model(model_name) # Pay the load cost once, up front
+    while True:
+        video_path = request_queue.get()
+        if video_path is None:
+            break
+        response_queue.put(audio.transcribe_audio_in_process(video_path, model_name))
+
+class WhisperClient:
+    """
+    Sends transcription requests to a worker process that keeps the Whisper model loaded,
+    so the load time (~2 s for tiny.en, ~7 s for large-v3) is paid once per process lifetime
+    instead of per call. The worker is spawned lazily and restarted if it dies.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        # spawn, not fork: CTranslate2/CUDA state does not survive a fork
+        self._context = mp.get_context("spawn")
+        self._process = None
+        self._request_queue = None
+        self._response_queue = None
+        self._lock = threading.Lock() # The worker serves one request at a time
+
+    def _ensure_worker(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        log.info(f"Starting Whisper worker process for model '{self.model_name}'...")
+        self._request_queue = self._context.Queue()
+        self._response_queue = self._context.Queue()
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(self.model_name, self._request_queue, self._response_queue),
+            daemon=True # Never outlives the main process
+        )
+        self._process.start()
+
+    def transcribe(self, video_path):
+        """Transcribes video_path in the worker. Returns transcribe_audio's result, or None on failure."""
+        with self._lock:
+            self._ensure_worker()
+            self._request_queue.put(video_path)
+            while True:
+                try:
+                    return self._response_queue.get(timeout=WORKER_POLL_INTERVAL_SEC)
+                except queue.Empty:
+                    if not self._process.is_alive():
+                        log.error(f"Whisper worker exited (code {self._process.exitcode}) while transcribing {video_path}.")
+                        self._process = None
+                        return None
+
+    def close(self):
+        """Stops the worker process, if running."""
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                self._request_queue.put(None)
+                self._process.join(timeout=10)
+            self._process = None
+
+def get_whisper_client(model_name):
+    """Returns the shared WhisperClient for model_name, creating it on first use."""
+    with _whisper_client_lock:
+        if model_name not in _whisper_client_cache:
+            client = WhisperClient(model_name)
+            atexit.register(client.close)
+            _whisper_client_cache[model_name] = client
+        return _whisper_client_cache[model_name]
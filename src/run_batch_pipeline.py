@@ -0,0 +1,86 @@
+# src/run_batch_pipeline.py
+
+import os
+import atexit
+import argparse
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import torch
+
+# --- Import project modules ---
+# Reuses the single-video pipeline (and its .env / configuration loading) for every video
+from src import run_single_video_pipeline as single_video
+from src.persistence import s3_utils, mongo_utils
+from src.processing import audio
+
+log = logging.getLogger(__name__) # Logging is configured by run_single_video_pipeline
+
+# --- Configuration ---
+# CPU only: with a CUDA device a single worker process is used (see __main__)
+DEFAULT_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+# --- Per-Worker State ---
+# S3/Mongo clients can't be shared across processes, so each worker creates its own once
+_worker_s3_client = None
+_worker_mongo_db = None
+
+def _init_worker(threads_per_worker):
+    """Pool initializer: splits the CPU cores between workers and opens this worker's clients."""
+    global _worker_s3_client, _worker_mongo_db
+    # Without this every worker's Whisper/transformer model would try to use all cores
+    audio.WHISPER_CPU_THREADS = max(1, threads_per_worker // audio.WHISPER_NUM_WORKERS) # Per Whisper replica
+    torch.set_num_threads(threads_per_worker)
+
+    _worker_s3_client = s3_utils.get_s3_client(single_video.AWS_ACCESS_KEY_ID, single_video.AWS_SECRET_ACCESS_KEY, single_video.AWS_REGION)
+    mongo_client = mongo_utils.get_mongo_client(single_video.MONGO_CONNECTION_STRING)
+    if mongo_client:
+        atexit.register(mongo_client.close)
+        _worker_mongo_db = mongo_utils.get_mongo_database(mongo_client, single_video.MONGO_DB_NAME)
+
+def _process_video(video_id):
+    """Runs the single-video pipeline for video_id inside a pool worker."""
+    if _worker_s3_client is None or _worker_mongo_db is None:
+        log.error(f"Worker failed to initialize S3 or MongoDB client. Skipping {video_id}.")
+        return False
+    s3_key = single_video.S3_KEY_TEMPLATE.format(video_id=video_id)
+    return single_video.process_single_video(video_id, s3_key, _worker_s3_client, _worker_mongo_db)
+
+
+# --- Script Entry Point ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the video processing pipeline for several videos in parallel processes.")
+    parser.add_argument("video_ids", nargs="+", help="Video IDs to process (S3 key: raw_videos/<video_id>.mp4)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help=f"Worker processes (default: {DEFAULT_MAX_WORKERS}; always 1 on a CUDA machine)")
+    args = parser.parse_args()
+
+    workers = max(1, min(args.workers, len(args.video_ids)))
+    if (audio.USE_CUDA or torch.cuda.is_available()) and workers > 1:
+        # Every spawned worker would load its own Whisper and sentiment models onto the GPU, and
+        # _gpu_section only limits threads within one process, so worker processes can't share
+        # the device safely. On GPU, use run_single_video_pipeline, whose threads share one copy.
+        log.warning(f"CUDA device found: limiting the batch pipeline to 1 GPU worker (requested {workers}).")
+        workers = 1
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    log.info(f"--- Starting Batch Pipeline: {len(args.video_ids)} videos, {workers} workers x {threads_per_worker} threads ---")
+
+    # spawn, not fork: CUDA, CTranslate2 and pymongo state must not be inherited from the parent
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             initializer=_init_worker, initargs=(threads_per_worker,)) as executor:
+        futures = {executor.submit(_process_video, video_id): video_id for video_id in args.video_ids}
+        for future in as_completed(futures):
+            video_id = futures[future]
+            try:
+                results[video_id] = future.result()
+            except Exception as e:
+                log.error(f"Worker crashed while processing {video_id}: {e}", exc_info=True)
+                results[video_id] = False
+
+    failed = [video_id for video_id, success in results.items() if not success]
+    if failed:
+        log.error(f"Processing failed for {len(failed)}/{len(results)} videos: {', '.join(failed)}. Check logs for details.")
+    else:
+        log.info(f"All {len(results)} videos processed successfully (or with warnings). Check logs and MongoDB.")
+    log.info("--- Batch Pipeline Finished ---")
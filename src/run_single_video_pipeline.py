@@ -1,11 +1,19 @@
 # src/run_single_video_pipeline.py
 
 import os
-import json
+import argparse
+import contextlib
+import orjson # Rust-backed JSON parser, several times faster than json for comment files
+import ijson # Streaming JSON parser for comment files too large to load at once
 import pandas as pd
 from dotenv import load_dotenv
 import logging
-import shutil # For cleaning up temp dir
+import shutil # For checking free space on the temp filesystem
+import tempfile
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 
 # --- Import project modules ---
 # This relies on the __init__.py files making 'src' a package
@@ -34,9 +42,151 @@ AWS_REGION = os.getenv("AWS_REGION")
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 MONGO_CONNECTION_STRING = os.getenv("MONGO_CONNECTION_STRING")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "video_analysis_db")
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENT_BATCH", 32)) # Texts per sentiment forward pass
+# Scene detection and transcription run concurrently in two threads (both spend their time in
+# native code that releases the GIL). Set SERIAL_STAGES=1 to run them one after the other, e.g.
+# when both would contend for the same GPU (hardware decode/OpenCL plus CUDA Whisper)
+RUN_STAGES_IN_PARALLEL = os.getenv("SERIAL_STAGES", "0") != "1"
+COMMENT_BATCH_SIZE = text.DEFAULT_BATCH_SIZE # Comments are many and short; larger batches after length sorting
+COMMENT_FIELDS = ['comment_id', 'author', 'published_at', 'text'] # Original fields kept with the sentiment (add others if needed)
+MONGO_WRITE_BATCH_SIZE = 1000 # Comment documents per insert round-trip
+STREAMING_MIN_BYTES = 50 * 1024 * 1024 # Comment files above this size are streamed with ijson
+STREAMING_BATCH_SIZE = 512 # Comments scored and saved per rolling batch when streaming
+COMMENT_WRITE_QUEUE_SIZE = 4 # Scored batches waiting for the Mongo writer thread (bounds memory)
+
+# Several videos can be processed concurrently from __main__ (PIPE_WORKERS threads). On CUDA, at
+# most GPU_SLOTS of them run Whisper or the sentiment model at a time, so they don't oversubscribe VRAM
+PIPE_WORKERS = int(os.getenv("PIPE_WORKERS", 4))
+GPU_SLOTS = int(os.getenv("GPU_SLOTS", audio.WHISPER_NUM_WORKERS))
+_gpu_section = threading.BoundedSemaphore(GPU_SLOTS) if audio.USE_CUDA else contextlib.nullcontext()
+S3_KEY_TEMPLATE = "raw_videos/{video_id}.mp4" # Same layout collect_data.py uploads to
 
 # --- Directories ---
-TEMP_PROCESSING_DIR = os.path.join(project_root, "data", "temp_processing") # Single temp dir
+# Per-video temp dirs (the downloaded video) go on RAM-backed tmpfs when it has room, so the
+# transient file never touches the disk. FAST_TMP overrides the location.
+FAST_TMP_DIR = os.getenv("FAST_TMP", "/dev/shm")
+FAST_TMP_MIN_FREE_BYTES = 2 * 1024 ** 3 # Containers often mount a tiny /dev/shm; use the default temp dir then
+
+def _temp_root():
+    """Returns the directory to create per-video temp dirs in (None = the system default)."""
+    if "FAST_TMP" in os.environ:
+        return FAST_TMP_DIR
+    try:
+        if shutil.disk_usage(FAST_TMP_DIR).free >= FAST_TMP_MIN_FREE_BYTES:
+            return FAST_TMP_DIR
+    except OSError:
+        pass # No /dev/shm (e.g. macOS)
+    return None
+
+def _load_comment_batches(comments_path):
+    """
+    Reads the comments JSON collected by collect_data.py as an iterable of comment lists.
+    Small files are parsed here with orjson; files above STREAMING_MIN_BYTES are checked in one
+    streaming pass and returned as a lazy ijson stream of STREAMING_BATCH_SIZE-comment batches,
+    so the whole file never sits in memory. Items that aren't comment objects are skipped.
+    Returns None if the file is missing, can't be parsed, or isn't a JSON list.
+    """
+    if not os.path.exists(comments_path):
+        log.warning(f"Comments file not found at {comments_path}. Skipping comment analysis.")
+        return None
+    try:
+        if os.path.getsize(comments_path) > STREAMING_MIN_BYTES:
+            # The first saved batch replaces the video's old comments, so a file that turns out
+            # to be malformed halfway must be rejected before anything is written
+            if not _is_comment_array(comments_path):
+                log.warning(f"Comments file {comments_path} does not contain a JSON list. Skipping comment analysis.")
+                return None
+            return _iter_comment_batches(comments_path, STREAMING_BATCH_SIZE)
+        with open(comments_path, 'rb') as f:
+            comments_data = orjson.loads(f.read())
+        if not isinstance(comments_data, list): # e.g. an object or null instead of the comment array
+            log.warning(f"Comments file {comments_path} does not contain a JSON list. Skipping comment analysis.")
+            return None
+        comments = [comment for comment in comments_data if isinstance(comment, dict)]
+        if len(comments) < len(comments_data):
+            log.warning(f"Skipped {len(comments_data) - len(comments)} non-object items in {comments_path}.")
+        return [comments[start:start + MONGO_WRITE_BATCH_SIZE] for start in range(0, len(comments), MONGO_WRITE_BATCH_SIZE)]
+    except (orjson.JSONDecodeError, ijson.JSONError, IOError) as e:
+        log.error(f"Error reading or parsing comments file {comments_path}: {e}", exc_info=True)
+        return None
+
+def _is_comment_array(comments_path):
+    """
+    Parses the whole file with ijson without building any objects (constant memory). Returns
+    False if the top level isn't an array; raises ijson.JSONError if the file is malformed or
+    truncated anywhere.
+    """
+    with open(comments_path, 'rb') as f:
+        events = ijson.parse(f)
+        first_event = next(events, None)
+        if first_event is None or first_event[1] != 'start_array':
+            return False
+        for _ in events:
+            pass
+    return True
+
+def _iter_comment_batches(comments_path, batch_size):
+    """
+    Yields lists of up to batch_size comments streamed from a comments JSON array, skipping
+    items that aren't objects.
+    """
+    with open(comments_path, 'rb') as f:
+        batch = []
+        skipped = 0
+        for comment in ijson.items(f, 'item'):
+            if not isinstance(comment, dict):
+                skipped += 1
+                continue
+            batch.append(comment)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    if skipped:
+        log.warning(f"Skipped {skipped} non-object items in {comments_path}.")
+
+def _comment_writer(mongo_db, video_id, write_queue, timestamp, write_status):
+    """
+    Consumer thread for the comments step: saves scored comment batches from write_queue until
+    it receives None. The first batch replaces this video's old comments, later ones are
+    appended. After a failed save the remaining batches are drained without writing.
+    """
+    replace = True
+    while True:
+        comment_sentiments = write_queue.get()
+        if comment_sentiments is None:
+            return
+        if write_status['saved'] and not mongo_utils.save_comment_sentiments(mongo_db, video_id, comment_sentiments,
+                                                                             timestamp=timestamp, replace=replace):
+            log.warning(f"Failed to save comment data for {video_id} to MongoDB.")
+            write_status['saved'] = False
+        replace = False
+
+def _transcribe(video_path):
+    """audio.transcribe_audio, holding a GPU slot on CUDA."""
+    with _gpu_section:
+        return audio.transcribe_audio(video_path) # Uses default 'tiny.en' model
+
+def _score_comments(comments_batch, sentiment_pipeline):
+    """
+    Returns the comment documents (with sentiment) for one batch of raw comments. Field
+    selection and text cleaning run as pandas column operations rather than per-comment Python.
+    """
+    comments_df = pd.DataFrame(comments_batch, columns=COMMENT_FIELDS) # Missing fields become NaN
+    comments_df['text'] = comments_df['text'].fillna('').astype(str).str.strip()
+    # Empty comments are kept but not scored (None label/score); the rest are sorted
+    # by length inside analyze_sentiments_batch, so each batch pads to similar lengths
+    has_text = comments_df['text'].str.len() > 0
+    with _gpu_section:
+        sentiments = text.analyze_sentiments_batch(comments_df.loc[has_text, 'text'].tolist(), sentiment_pipeline,
+                                                   batch_size=COMMENT_BATCH_SIZE)
+    comments_df['sentiment_label'] = None
+    comments_df['sentiment_score'] = None
+    comments_df.loc[has_text, 'sentiment_label'] = [sentiment.get('label') for sentiment in sentiments]
+    comments_df.loc[has_text, 'sentiment_score'] = [sentiment.get('score') for sentiment in sentiments]
+    # NaN -> None so missing fields are stored as null, as before
+    return comments_df.astype(object).where(comments_df.notna(), None).to_dict('records')
 
 # --- Main Processing Function ---
 # Inside process_single_video function (Corrected)
@@ -57,147 +207,172 @@ def process_single_video(video_id, s3_key, s3_client, mongo_db):
         return False
     # --- END CORRECTED CHECK ---
 
-    # Ensure temp directory exists and is clean for this video
-    video_temp_dir = os.path.join(TEMP_PROCESSING_DIR, video_id)
-    if os.path.exists(video_temp_dir):
-        shutil.rmtree(video_temp_dir) # Remove old temp data if exists
-    os.makedirs(video_temp_dir, exist_ok=True)
-
     local_video_path = None # Initialize path
     success_flag = True # Track overall success
     # ... rest of function ...
 
-    try:
-        # 1. Download Video
-        local_video_path = s3_utils.download_s3_object(s3_client, S3_BUCKET_NAME, s3_key, video_temp_dir)
-        if not local_video_path:
-            log.error(f"Failed to download video {s3_key}. Skipping further processing for {video_id}.")
-            return False # Cannot proceed without video
-
-        # --- Save basic video info to Mongo ---
-        # (Could fetch metadata here too if needed, or assume it's done elsewhere)
-        video_doc = {'video_id': video_id, 's3_key': s3_key, 's3_bucket': S3_BUCKET_NAME}
-        mongo_utils.save_video_metadata(mongo_db, video_doc)
-
-        # 2. Detect Scenes
-        log.info(f"Starting scene detection for {video_id}...")
-        scene_timestamps = video.detect_scenes(local_video_path)
-        # Save even if empty list
-        if not mongo_utils.save_scene_data(mongo_db, video_id, scene_timestamps):
-            log.warning(f"Failed to save scene data for {video_id} to MongoDB.")
-            success_flag = False # Mark as partial failure
-
-        # 3. Transcribe Audio
-        log.info(f"Starting audio transcription for {video_id}...")
-        transcription_result = audio.transcribe_audio(local_video_path) # Uses default 'tiny.en' model
-
-        transcript_segments_with_sentiment = [] # Initialize list for combined data
-
-        if transcription_result and "segments" in transcription_result:
-            log.info(f"Transcription successful for {video_id}. Analyzing sentiment...")
-            # 4. Analyze Transcript Sentiment (using Transformers)
-            sentiment_pipeline = text.get_sentiment_pipeline() # Load/get cached pipeline
-            if sentiment_pipeline:
-                for i, segment in enumerate(transcription_result["segments"]):
-                    segment_text = segment.get('text', '').strip()
-                    sentiment = text.analyze_sentiment_transformer(segment_text, sentiment_pipeline)
-                    transcript_segments_with_sentiment.append({
-                        'start': segment.get('start'),
-                        'end': segment.get('end'),
-                        'text': segment_text,
-                        'sentiment_label': sentiment.get('label'),
-                        'sentiment_score': sentiment.get('score')
-                    })
-                    # Optional: Log progress
-                    # if (i + 1) % 20 == 0:
-                    #     log.info(f"Analyzed sentiment for {i+1} transcript segments...")
-                log.info(f"Sentiment analysis complete for {len(transcript_segments_with_sentiment)} transcript segments.")
-
-                # Save transcript+sentiment to Mongo
-                if not mongo_utils.save_transcript_segments(mongo_db, video_id, transcript_segments_with_sentiment):
-                     log.warning(f"Failed to save transcript data for {video_id} to MongoDB.")
-                     success_flag = False
+    # The temp dir (and the downloaded video in it) is removed when the with block exits
+    with tempfile.TemporaryDirectory(prefix=f"{video_id}_", dir=_temp_root()) as video_temp_dir:
+        try:
+            # 1. Download Video, while the sentiment model loads and the comments file
+            # (assumed already collected by collect_data.py) is parsed in background threads
+            comments_path = os.path.join(project_root, "data", "comments", f"{video_id}_comments.json")
+            executor = ThreadPoolExecutor(max_workers=3)
+            download_future = executor.submit(s3_utils.download_s3_object_ranged, s3_client, S3_BUCKET_NAME, s3_key, video_temp_dir)
+            pipeline_future = executor.submit(text.get_sentiment_pipeline) # Load/get cached pipeline
+            comments_future = executor.submit(_load_comment_batches, comments_path)
+            executor.shutdown(wait=False) # Pipeline and comments are awaited only when needed
+
+            local_video_path = download_future.result()
+            if not local_video_path:
+                log.error(f"Failed to download video {s3_key}. Skipping further processing for {video_id}.")
+                return False # Cannot proceed without video
+
+            # --- Save basic video info to Mongo ---
+            # (Could fetch metadata here too if needed, or assume it's done elsewhere)
+            video_doc = {'video_id': video_id, 's3_key': s3_key, 's3_bucket': S3_BUCKET_NAME}
+            mongo_utils.save_video_metadata(mongo_db, video_doc)
+
+            # 2. Detect Scenes and 3. Transcribe Audio (independent; overlapped unless SERIAL_STAGES=1)
+            log.info(f"Starting scene detection and audio transcription for {video_id}...")
+            if RUN_STAGES_IN_PARALLEL:
+                with ThreadPoolExecutor(max_workers=2) as stage_executor:
+                    scenes_future = stage_executor.submit(video.detect_scenes, local_video_path)
+                    transcription_future = stage_executor.submit(_transcribe, local_video_path)
+                    scene_timestamps = scenes_future.result()
+                    transcription_result = transcription_future.result()
             else:
-                log.error(f"Sentiment pipeline failed to load. Cannot analyze transcript sentiment for {video_id}.")
-                # Save transcript without sentiment? Or mark as failed? For now, just log.
+                scene_timestamps = video.detect_scenes(local_video_path)
+                transcription_result = _transcribe(local_video_path)
+
+            # Save even if empty list
+            if not mongo_utils.save_scene_data(mongo_db, video_id, scene_timestamps):
+                log.warning(f"Failed to save scene data for {video_id} to MongoDB.")
+                success_flag = False # Mark as partial failure
+
+            transcript_segments_with_sentiment = [] # Initialize list for combined data
+
+            # The one sentiment pipeline for both steps below (loaded in the background during
+            # the download); if it failed to load, both sentiment steps are skipped
+            sentiment_pipeline = pipeline_future.result()
+            if not sentiment_pipeline:
+                log.error(f"Sentiment pipeline failed to load. Cannot analyze transcript or comment sentiment for {video_id}.")
                 success_flag = False
-        else:
-            log.warning(f"Transcription failed or produced no segments for {video_id}.")
-            # Optionally save an empty list to indicate processing attempted but failed
-            if not mongo_utils.save_transcript_segments(mongo_db, video_id, []):
-                log.warning(f"Failed to save empty transcript marker for {video_id} to MongoDB.")
-            success_flag = False # Mark as partial failure
-
-        # 5. Analyze Comment Sentiment
-        # (Assuming comments JSON already collected by collect_data.py)
-        log.info(f"Loading and analyzing comments for {video_id}...")
-        comments_path = os.path.join(project_root, "data", "comments", f"{video_id}_comments.json")
-        comment_sentiments = []
-        if os.path.exists(comments_path):
-            try:
-                with open(comments_path, 'r', encoding='utf-8') as f:
-                    comments_data = json.load(f)
-
-                sentiment_pipeline = text.get_sentiment_pipeline() # Ensure pipeline is loaded
+
+            if transcription_result and "segments" in transcription_result:
+                log.info(f"Transcription successful for {video_id}. Analyzing sentiment...")
+                # 4. Analyze Transcript Sentiment (using Transformers)
                 if sentiment_pipeline:
-                    for i, comment in enumerate(comments_data):
-                        comment_text = comment.get('text', '').strip()
-                        sentiment = text.analyze_sentiment_transformer(comment_text, sentiment_pipeline)
-                        comment_sentiments.append({
-                            'comment_id': comment.get('comment_id'),
-                            'author': comment.get('author'),
-                            'published_at': comment.get('published_at'),
-                            'text': comment_text,
+                    segments = transcription_result["segments"]
+                    segment_texts = [(segment.get('text') or '').strip() for segment in segments]
+                    # Empty segments (silence, music) are kept so segment_index still lines up with
+                    # Whisper's output, but not scored (None label/score), as with empty comments
+                    # One batched pipeline call for all segments instead of one forward pass per segment
+                    with _gpu_section:
+                        sentiments = iter(text.analyze_sentiments_batch([segment_text for segment_text in segment_texts if segment_text],
+                                                                        sentiment_pipeline, batch_size=SENTIMENT_BATCH_SIZE))
+                    transcript_segments_with_sentiment = []
+                    for segment, segment_text in zip(segments, segment_texts):
+                        sentiment = next(sentiments) if segment_text else {}
+                        transcript_segments_with_sentiment.append({
+                            'start': segment.get('start'),
+                            'end': segment.get('end'),
+                            'text': segment_text,
                             'sentiment_label': sentiment.get('label'),
                             'sentiment_score': sentiment.get('score')
-                            # Add other original comment fields if needed
                         })
-                        # Optional: Log progress
-                        # if (i + 1) % 10 == 0:
-                        #      log.info(f"Analyzed sentiment for {i+1} comments...")
-                    log.info(f"Sentiment analysis complete for {len(comment_sentiments)} comments.")
-
-                    # Save comments+sentiment to Mongo
-                    if not mongo_utils.save_comment_sentiments(mongo_db, video_id, comment_sentiments):
-                        log.warning(f"Failed to save comment data for {video_id} to MongoDB.")
-                        success_flag = False
-                else:
-                    log.error(f"Sentiment pipeline failed to load. Cannot analyze comment sentiment for {video_id}.")
+                    log.info(f"Sentiment analysis complete for {len(transcript_segments_with_sentiment)} transcript segments.")
+
+                    # Save transcript+sentiment to Mongo
+                    if not mongo_utils.save_transcript_segments(mongo_db, video_id, transcript_segments_with_sentiment):
+                         log.warning(f"Failed to save transcript data for {video_id} to MongoDB.")
+                         success_flag = False
+            else:
+                log.warning(f"Transcription failed or produced no segments for {video_id}.")
+                # Optionally save an empty list to indicate processing attempted but failed
+                if not mongo_utils.save_transcript_segments(mongo_db, video_id, []):
+                    log.warning(f"Failed to save empty transcript marker for {video_id} to MongoDB.")
+                success_flag = False # Mark as partial failure
+
+            # 5. Analyze Comment Sentiment
+            log.info(f"Loading and analyzing comments for {video_id}...")
+            comment_batches = comments_future.result()
+            if comment_batches is not None and sentiment_pipeline:
+                batches_queued = 0 # Anything queued has replaced the video's old comments
+                comments_saved = True
+                try:
+                    # Score batch by batch while a writer thread saves the previous batches,
+                    # so inference and Mongo round-trips overlap (one shared last_updated)
+                    write_queue = queue.Queue(maxsize=COMMENT_WRITE_QUEUE_SIZE)
+                    write_status = {'saved': True}
+                    writer = threading.Thread(target=_comment_writer, daemon=True,
+                                              args=(mongo_db, video_id, write_queue, datetime.now(timezone.utc), write_status))
+                    writer.start()
+                    comment_count = 0
+                    try:
+                        for comments_batch in comment_batches:
+                            if not write_status['saved']:
+                                break # Saving failed; don't score the rest
+                            comment_sentiments = _score_comments(comments_batch, sentiment_pipeline)
+                            comment_count += len(comment_sentiments)
+                            write_queue.put(comment_sentiments)
+                            batches_queued += 1
+                        if batches_queued == 0: # No comments at all: still clear any old ones
+                            write_queue.put([])
+                    finally:
+                        write_queue.put(None) # Stop the writer once it has saved everything queued
+                        writer.join()
+                    comments_saved = write_status['saved']
+                    log.info(f"Sentiment analysis complete for {comment_count} comments.")
+
+                # The file was validated before the first write, but old comments are replaced by
+                # the first saved batch: a failure after it still leaves only the batches before
+                # it in Mongo, so the run is reported as failed and should be re-run
+                except ijson.JSONError as e:
+                    log.error(f"Error parsing streamed comments file for {video_id}: {e}", exc_info=True)
+                    comments_saved = False
+                except Exception as e:
+                     log.error(f"Unexpected error processing comments for {video_id}: {e}", exc_info=True)
+                     comments_saved = False
+                if not comments_saved:
                     success_flag = False
+                    if batches_queued:
+                        log.warning(f"Comments for {video_id} were only partly replaced ({batches_queued} batches queued before the failure).")
+            # Missing or unreadable comments are logged by _load_comment_batches (and a missing
+            # pipeline above); comment analysis is skipped then
 
-            except (json.JSONDecodeError, IOError) as e:
-                log.error(f"Error reading or parsing comments file {comments_path}: {e}", exc_info=True)
-                # Optionally save empty comments? For now, just log.
-            except Exception as e:
-                 log.error(f"Unexpected error processing comments for {video_id}: {e}", exc_info=True)
+            log.info(f"--- Finished processing for Video ID: {video_id} ---")
+            return success_flag
 
-        else:
-            log.warning(f"Comments file not found for {video_id} at {comments_path}. Skipping comment analysis.")
-            # Optionally save empty comments? For now, just log.
+        except Exception as e:
+            log.error(f"An unexpected critical error occurred during processing for {video_id}: {e}", exc_info=True)
+            return False # Indicate failure
 
-        log.info(f"--- Finished processing for Video ID: {video_id} ---")
-        return success_flag
 
-    except Exception as e:
-        log.error(f"An unexpected critical error occurred during processing for {video_id}: {e}", exc_info=True)
-        return False # Indicate failure
+# --- Script Entry Point ---
+if __name__ == "__main__":
+    # --- Select Videos to Process ---
+    # Use VIDEO_IDs you downloaded with the *updated* collect_data.py
+    TEST_VIDEO_ID = "bcGxg3c1HE8"  # <<< REPLACE WITH A VALID ID FROM YOUR LATEST RUN
 
-    finally:
-        # 6. Clean up temporary file ALWAYS
-        if local_video_path and os.path.exists(local_video_path):
-            try:
-                # Remove the whole temp dir for this video
-                shutil.rmtree(video_temp_dir)
-                # log.info(f"Removed temporary directory: {video_temp_dir}")
-            except OSError as e:
-                log.warning(f"Could not remove temporary directory {video_temp_dir}: {e}")
+    parser = argparse.ArgumentParser(description="Runs the video processing pipeline for one or more videos.")
+    parser.add_argument("video_ids", nargs="*",
+                        help=f"Video IDs to process (default: $VIDEO_IDS, comma-separated, or {TEST_VIDEO_ID})")
+    parser.add_argument("--ids-file", help="File with one video ID per line, processed after any given on the command line")
+    parser.add_argument("--workers", type=int, default=PIPE_WORKERS, help="Videos processed concurrently (default: $PIPE_WORKERS or 4)")
+    args = parser.parse_args()
 
+    video_ids = list(args.video_ids)
+    if args.ids_file:
+        with open(args.ids_file, 'r', encoding='utf-8') as f:
+            video_ids += [line.strip() for line in f if line.strip()]
+    if not video_ids:
+        video_ids = [video_id.strip() for video_id in os.getenv("VIDEO_IDS", "").split(",") if video_id.strip()] or [TEST_VIDEO_ID]
 
-# --- Script Entry Point ---
-if __name__ == "__main__":
-    log.info("--- Starting Single Video Pipeline Test ---")
+    log.info(f"--- Starting Video Pipeline: {len(video_ids)} video(s), up to {args.workers} at a time ---")
 
     # --- Initialization ---
+    # One S3 client and one MongoClient shared by all worker threads (both are thread-safe and pooled)
     s3_client = s3_utils.get_s3_client(AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION)
     mongo_client = mongo_utils.get_mongo_client(MONGO_CONNECTION_STRING)
 
@@ -212,23 +387,30 @@ if __name__ == "__main__":
         mongo_client.close() # Close client if db fails
         exit()
 
-    # --- Select Video to Process ---
-    # Use one of the VIDEO_IDs you downloaded with the *updated* collect_data.py
-    TEST_VIDEO_ID = "bcGxg3c1HE8"  # <<< REPLACE WITH A VALID ID FROM YOUR LATEST RUN
-    # Construct the expected S3 key (assuming collect_data saved as VIDEO_ID.mp4)
-    TEST_S3_KEY = f"raw_videos/{TEST_VIDEO_ID}.mp4"
-
     # --- Execute Processing ---
-    overall_success = process_single_video(TEST_VIDEO_ID, TEST_S3_KEY, s3_client, mongo_db)
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(video_ids)))) as executor:
+        futures = {
+            executor.submit(process_single_video, video_id, S3_KEY_TEMPLATE.format(video_id=video_id), s3_client, mongo_db): video_id
+            for video_id in video_ids
+        }
+        for future in as_completed(futures):
+            video_id = futures[future]
+            results[video_id] = future.result() # process_single_video logs and returns False on errors
+            if results[video_id]:
+                log.info(f"Processing for video {video_id} completed successfully (or with warnings).")
+            else:
+                log.error(f"Processing for video {video_id} failed. Check logs for details.")
 
-    if overall_success:
-        log.info(f"Processing for video {TEST_VIDEO_ID} completed successfully (or with warnings). Check logs and MongoDB.")
+    failed = [video_id for video_id, success in results.items() if not success]
+    if failed:
+        log.error(f"Processing failed for {len(failed)}/{len(results)} videos: {', '.join(failed)}.")
     else:
-        log.error(f"Processing for video {TEST_VIDEO_ID} failed. Check logs for details.")
+        log.info(f"All {len(results)} videos processed successfully (or with warnings). Check logs and MongoDB.")
 
     # --- Cleanup ---
     if mongo_client:
         mongo_client.close()
         log.info("MongoDB connection closed.")
 
-    log.info("--- Single Video Pipeline Test Finished ---")
\ No newline at end of file
+    log.info("--- Video Pipeline Finished ---")
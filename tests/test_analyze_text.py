@@ -0,0 +1,32 @@
+# tests/test_analyze_text.py
+
+import numpy as np
+import pytest
+
+from src import analyze_text
+
+
+@pytest.fixture
+def toy_lexicon(monkeypatch):
+    """Small VADER-style lexicon, so the lexicon path runs without the nltk download."""
+    words = {"good": 1.9, "bad": -2.5}
+    hashes = np.array([hash(word) for word in words], dtype=np.int64)
+    weights = np.array(list(words.values()), dtype=np.float32)
+    order = np.argsort(hashes)
+    monkeypatch.setattr(analyze_text, "LEXICON_HASHES", hashes[order])
+    monkeypatch.setattr(analyze_text, "LEXICON_WEIGHTS", weights[order])
+
+
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_score_texts_ignores_nul_characters(toy_lexicon, monkeypatch, use_numba):
+    if not use_numba:
+        monkeypatch.setattr(analyze_text, "score_segments", None)
+    elif analyze_text.score_segments is None:
+        pytest.skip("Numba is not installed")
+
+    polarity, subjectivity = analyze_text._score_texts(["good\x00good", "bad", "\x00"])
+    expected_polarity, expected_subjectivity = analyze_text._score_texts(["good good", "bad", ""])
+
+    np.testing.assert_allclose(polarity, expected_polarity, rtol=1e-6)
+    np.testing.assert_allclose(subjectivity, expected_subjectivity, rtol=1e-6)
+    assert polarity[1] < 0 < polarity[0]
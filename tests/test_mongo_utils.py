@@ -0,0 +1,59 @@
+# tests/test_mongo_utils.py
+
+from pymongo import DeleteMany, InsertOne
+from pymongo.errors import OperationFailure
+
+from src.persistence import mongo_utils
+
+
+class FakeCollection:
+    """Stores inserted documents and enforces pymongo's unacknowledged-write restrictions."""
+
+    def __init__(self, write_concern):
+        self.write_concern = write_concern
+        self.documents = []
+
+    def bulk_write(self, ops, ordered=True, bypass_document_validation=False):
+        self._check(bypass_document_validation)
+        for op in ops:
+            if isinstance(op, DeleteMany):
+                self.documents = [doc for doc in self.documents if doc['video_id'] != op._filter['video_id']]
+            elif isinstance(op, InsertOne):
+                self.documents.append(op._doc)
+
+    def insert_many(self, documents, ordered=True, bypass_document_validation=False):
+        self._check(bypass_document_validation)
+        self.documents.extend(documents)
+
+    def _check(self, bypass_document_validation):
+        if bypass_document_validation and not self.write_concern.acknowledged:
+            raise OperationFailure("Cannot set bypass_document_validation with unacknowledged write concern")
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def get_collection(self, name, write_concern=None):
+        collection = self.collections.setdefault(name, FakeCollection(write_concern))
+        collection.write_concern = write_concern
+        return collection
+
+
+def test_save_comment_sentiments_appends_later_batches():
+    db = FakeDatabase()
+    batches = [[{'comment_id': f"{start + i}", 'text': "hi"} for i in range(3)] for start in (0, 3, 6)]
+
+    for batch_index, batch in enumerate(batches):
+        assert mongo_utils.save_comment_sentiments(db, "vid", batch, replace=(batch_index == 0))
+
+    stored = db.collections['comments'].documents
+    assert [doc['comment_id'] for doc in stored] == [str(i) for i in range(9)]
+
+
+def test_save_comment_sentiments_replace_drops_old_comments():
+    db = FakeDatabase()
+    mongo_utils.save_comment_sentiments(db, "vid", [{'comment_id': "old"}])
+    mongo_utils.save_comment_sentiments(db, "vid", [{'comment_id': "new"}])
+
+    assert [doc['comment_id'] for doc in db.collections['comments'].documents] == ["new"]
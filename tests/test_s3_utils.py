@@ -0,0 +1,25 @@
+# tests/test_s3_utils.py
+
+from botocore.exceptions import EndpointConnectionError, ReadTimeoutError
+
+import pytest
+
+from src.persistence import s3_utils
+
+
+class UnreachableS3Client:
+    """head_object fails the way botocore does when the endpoint can't be reached."""
+
+    def __init__(self, error):
+        self.error = error
+
+    def head_object(self, Bucket, Key):
+        raise self.error
+
+
+@pytest.mark.parametrize("error", [
+    EndpointConnectionError(endpoint_url="https://s3.example.invalid"),
+    ReadTimeoutError(endpoint_url="https://s3.example.invalid"),
+])
+def test_download_s3_object_ranged_returns_none_on_connection_errors(tmp_path, error):
+    assert s3_utils.download_s3_object_ranged(UnreachableS3Client(error), "bucket", "raw_videos/x.mp4", str(tmp_path)) is None
@@ -0,0 +1,45 @@
+# tests/test_video.py
+
+import wave
+
+import pytest
+
+from src.processing import video
+
+av = pytest.importorskip("av")
+
+
+class ContainerSpy:
+    """Wraps a PyAV container and records whether it was closed."""
+
+    def __init__(self, container):
+        self._container = container
+        self.closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._container, name)
+
+    def close(self):
+        self.closed = True
+        self._container.close()
+
+
+def test_open_pyav_closes_audio_only_files(tmp_path, monkeypatch):
+    audio_path = str(tmp_path / "audio_only.wav")
+    with wave.open(audio_path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b'\0\0' * 800)
+
+    opened = []
+    real_open = av.open
+
+    def spy_open(*args, **kwargs):
+        opened.append(ContainerSpy(real_open(*args, **kwargs)))
+        return opened[-1]
+
+    monkeypatch.setattr(video.av, "open", spy_open)
+
+    assert video._open_pyav(audio_path, hwaccel=None) is None
+    assert opened and all(container.closed for container in opened)